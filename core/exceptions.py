@@ -1,7 +1,19 @@
 from rest_framework.views import exception_handler
-from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import ValidationError, APIException
+
+from drugs.services.ddi_client import DDIServerError
+
+
+class DDIUnavailable(APIException):
+    status_code = 503
+    default_detail = "Interaction scoring is temporarily unavailable."
+    default_code = "ddi_unavailable"
+
 
 def custom_exception_handler(exc, context):
+    if isinstance(exc, DDIServerError):
+        exc = DDIUnavailable()
+
     response = exception_handler(exc, context)
 
     if response is not None:
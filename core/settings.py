@@ -32,6 +32,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     # 3rd Party
     'corsheaders',
@@ -181,3 +182,62 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 ACCOUNT_LOGIN_METHODS = {"email"}  # login only with email
 ACCOUNT_SIGNUP_FIELDS = ["email*", "username*", "password1*", "password2*"]
 ACCOUNT_EMAIL_VERIFICATION = "optional"  # or "mandatory" if you require verification
+
+# DDI model
+DDI_BATCH_SIZE = int(os.getenv("DDI_BATCH_SIZE", "32"))
+DDI_MODEL_VERSION = os.getenv("DDI_MODEL_VERSION", "0xCode/3AWN")
+DDI_SCORE_CACHE_SIZE = int(os.getenv("DDI_SCORE_CACHE_SIZE", "5000"))
+DDI_ENCODING_CACHE_SIZE = int(os.getenv("DDI_ENCODING_CACHE_SIZE", "5000"))
+
+# Shared DDI inference server (manage.py run_ddi_server); empty = in-process inference
+DDI_SERVER_SOCKET = os.getenv("DDI_SERVER_SOCKET", "")
+DDI_SERVER_MAX_WAIT_MS = float(os.getenv("DDI_SERVER_MAX_WAIT_MS", "5"))
+DDI_SERVER_TIMEOUT = float(os.getenv("DDI_SERVER_TIMEOUT", "30"))
+# Score in-process when the server is down; each worker then loads (and keeps) its own model copy
+DDI_SERVER_FALLBACK = os.getenv("DDI_SERVER_FALLBACK", "False") == "True"
+
+# DDI inference backend: "fp32", "int8" (dynamic quantization of Linear layers)
+# or "torchscript" (modules from manage.py build_ddi_artifacts, eager fp32 if missing)
+DDI_BACKEND = os.getenv("DDI_BACKEND", "fp32")
+DDI_INT8_CACHE = os.getenv("DDI_INT8_CACHE", "False") == "True"
+DDI_SEQ_BUCKETS = os.getenv("DDI_SEQ_BUCKETS", "64,128,256").split(",")
+
+# Precomputed all-pairs score matrix (manage.py build_ddi_matrix publishes it behind this symlink); empty = disabled
+DDI_MATRIX_PATH = os.getenv("DDI_MATRIX_PATH", "")
+
+# Screen new medications in the background (manage.py run_screening_worker); ?async= overrides per request
+DDI_ASYNC_SCREENING = os.getenv("DDI_ASYNC_SCREENING", "False") == "True"
+
+# PubChem: seconds before a "not found" answer is asked again
+PUBCHEM_NEGATIVE_TTL = int(os.getenv("PUBCHEM_NEGATIVE_TTL", str(7 * 24 * 3600)))
+
+# PubChem client: base URL (point at a stub server in tests), per-process rate limit in requests/s,
+# retries with backoff, and a circuit breaker that opens after N consecutive failures for COOLDOWN seconds
+PUBCHEM_BASE_URL = os.getenv("PUBCHEM_BASE_URL", "https://pubchem.ncbi.nlm.nih.gov/rest/pug")
+PUBCHEM_TIMEOUT = float(os.getenv("PUBCHEM_TIMEOUT", "5"))
+PUBCHEM_MAX_RETRIES = int(os.getenv("PUBCHEM_MAX_RETRIES", "2"))
+PUBCHEM_RATE_LIMIT = float(os.getenv("PUBCHEM_RATE_LIMIT", "5"))
+PUBCHEM_BREAKER_THRESHOLD = int(os.getenv("PUBCHEM_BREAKER_THRESHOLD", "5"))
+PUBCHEM_BREAKER_COOLDOWN = float(os.getenv("PUBCHEM_BREAKER_COOLDOWN", "30"))
+# Concurrent PubChem lookups when resolving many names at once
+PUBCHEM_MAX_WORKERS = int(os.getenv("PUBCHEM_MAX_WORKERS", "5"))
+
+# Local PubChem mirror (manage.py build_pubchem_mirror publishes it behind this symlink), checked before the API; empty = disabled.
+# With PUBCHEM_MIRROR_ONLY a name missing from the mirror is treated as unknown instead of asking PubChem.
+PUBCHEM_MIRROR_PATH = os.getenv("PUBCHEM_MIRROR_PATH", "")
+PUBCHEM_MIRROR_ONLY = os.getenv("PUBCHEM_MIRROR_ONLY", "False") == "True"
+
+# In-memory catalog indexes (fuzzy names, autocomplete) check for catalog changes at most this often
+CATALOG_REFRESH_SECONDS = float(os.getenv("CATALOG_REFRESH_SECONDS", "30"))
+
+# Fuzzy name matching (RapidFuzz WRatio, 0-100): auto-resolve at DRUG_FUZZY_CUTOFF, suggest from DRUG_FUZZY_SUGGEST_CUTOFF
+DRUG_FUZZY_CUTOFF = float(os.getenv("DRUG_FUZZY_CUTOFF", "90"))
+DRUG_FUZZY_SUGGEST_CUTOFF = float(os.getenv("DRUG_FUZZY_SUGGEST_CUTOFF", "70"))
+
+# App logs (e.g. which DDI backend/mode each worker loaded) to stderr, which gunicorn collects
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {"drugs": {"handlers": ["console"], "level": os.getenv("DRUGS_LOG_LEVEL", "INFO")}},
+}
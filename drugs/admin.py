@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Medication, Drug, DrugAlternative, ActiveIngredient
+from .models import Medication, Drug, DrugAlternative, ActiveIngredient, DDIPrediction, ScreeningJob, \
+    MedicationInteraction, PubChemLookup, Herb
 
 
 # Register your models here.
@@ -19,4 +20,32 @@ class DrugAdmin(admin.ModelAdmin):
 
 @admin.register(DrugAlternative)
 class DrugAlternativeAdmin(admin.ModelAdmin):
-    pass
+    list_filter = ['source']
+
+
+@admin.register(DDIPrediction)
+class DDIPredictionAdmin(admin.ModelAdmin):
+    list_display = ['pair_key', 'model_version', 'score', 'created_at']
+
+
+@admin.register(ScreeningJob)
+class ScreeningJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'medication', 'status', 'attempts', 'created_at', 'finished_at']
+    list_filter = ['status']
+
+
+@admin.register(MedicationInteraction)
+class MedicationInteractionAdmin(admin.ModelAdmin):
+    list_display = ['user', 'medication_a', 'medication_b', 'score', 'severity', 'model_version']
+
+
+@admin.register(PubChemLookup)
+class PubChemLookupAdmin(admin.ModelAdmin):
+    list_display = ['name', 'smiles', 'fetched_at']
+    search_fields = ['name']
+
+
+@admin.register(Herb)
+class HerbAdmin(admin.ModelAdmin):
+    search_fields = ['name']
+    autocomplete_fields = ['drugs']
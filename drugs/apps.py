@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class DrugsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'drugs'
\ No newline at end of file
+    name = 'drugs'
+
+    def ready(self):
+        import drugs.signals
\ No newline at end of file
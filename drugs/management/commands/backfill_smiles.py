@@ -0,0 +1,163 @@
+import json
+import os
+import tempfile
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from tqdm import tqdm
+
+from drugs.models import ActiveIngredient, Medication
+from drugs.services.interactions import rescore_medications
+from drugs.services.medication_links import relink_medications
+from drugs.services.pubchem import fetch_smiles_many, get_client
+from drugs.services.pubchem_cache import cached_lookups, normalize_name, record_lookups
+
+MISSING_SMILES = Q(smiles__isnull=True) | Q(smiles="")
+
+
+class Command(BaseCommand):
+    help = "Fill in SMILES for ActiveIngredient rows that have none, from PubChem (resumable)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=200)
+        parser.add_argument("--checkpoint", default=os.path.join(tempfile.gettempdir(), "backfill_smiles.checkpoint.json"),
+                            help="Progress file; a rerun continues after the last finished batch")
+        parser.add_argument("--retry-failed", action="store_true",
+                            help="Only retry the rows PubChem could not answer in earlier runs")
+        parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint")
+
+    def handle(self, *args, **options):
+        checkpoint = options["checkpoint"]
+        state = {"last_id": 0, "failed": []}
+
+        if os.path.exists(checkpoint) and not options["restart"]:
+            with open(checkpoint) as f:
+                state = json.load(f)
+            self.stdout.write(
+                f"↩️ Resuming after id {state['last_id']}, {len(state['failed'])} failed rows recorded"
+            )
+
+        retry_ids = []
+        if options["retry_failed"]:
+            retry_ids = state["failed"]
+            state["failed"] = []
+            total = len(retry_ids)
+            batches = self.retry_batches(list(retry_ids), options["batch_size"])
+        else:
+            total = ActiveIngredient.objects.filter(MISSING_SMILES, id__gt=state["last_id"]).count()
+            batches = self.keyset_batches(state["last_id"], options["batch_size"])
+
+        self.stdout.write(f"🧪 {total} ingredients without SMILES")
+
+        counts = {"resolved": 0, "not_found": 0, "failed": 0}
+        started = time.monotonic()
+        client = get_client()
+
+        with tqdm(total=total, desc="Backfilling SMILES", ncols=120) as bar:
+            for batch in batches:
+                resolved, not_found, failed = self.resolve(batch)
+
+                counts["resolved"] += resolved
+                counts["not_found"] += not_found
+                counts["failed"] += len(failed)
+                state["failed"].extend(failed)
+                if options["retry_failed"]:
+                    # ids not retried yet stay recorded if the run stops here
+                    del retry_ids[:options["batch_size"]]
+                    self.save_checkpoint(checkpoint, {**state, "failed": state["failed"] + retry_ids})
+                else:
+                    state["last_id"] = batch[-1].id
+                    self.save_checkpoint(checkpoint, state)
+
+                bar.update(len(batch))
+                bar.set_postfix(counts)
+
+                if client.breaker and client.breaker.state == "open":
+                    raise CommandError(
+                        "PubChem keeps failing (circuit open); rerun later to resume from the checkpoint."
+                    )
+
+        elapsed = time.monotonic() - started
+        done = sum(counts.values())
+        self.stdout.write(
+            f"📊 {done} rows in {elapsed:.1f}s ({done / elapsed if elapsed else 0:.1f} rows/s), "
+            f"PubChem: {client.stats()}"
+        )
+
+        if state["failed"]:
+            self.stdout.write(self.style.WARNING(
+                f"⚠️ {len(state['failed'])} rows failed; rerun with --retry-failed"
+            ))
+        else:
+            os.remove(checkpoint)
+
+        if counts["resolved"]:
+            # medications left without SMILES may resolve now; score their pairs
+            relinked = relink_medications(
+                Medication.objects.filter(is_finished=False, resolved_smiles=[]),
+                on_changed=rescore_medications
+            )
+            self.stdout.write(f"🔗 Re-linked {relinked} medications without SMILES")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {counts['resolved']} resolved, {counts['not_found']} unknown to PubChem"
+        ))
+
+    def keyset_batches(self, after, size):
+        while True:
+            batch = list(
+                ActiveIngredient.objects.filter(MISSING_SMILES, id__gt=after)
+                .order_by("id")[:size]
+            )
+            if not batch:
+                return
+            yield batch
+            after = batch[-1].id
+
+    def retry_batches(self, ids, size):
+        # one batch per slice of ids, even when empty, so the caller can
+        # drop each slice from the checkpoint as it is done
+        for start in range(0, len(ids), size):
+            yield list(
+                ActiveIngredient.objects.filter(MISSING_SMILES, id__in=ids[start:start + size])
+                .order_by("id")
+            )
+
+    def resolve(self, batch):
+        """
+        Resolve one batch: cached answers first (one query), the rest from
+        PubChem concurrently, then one bulk write for the lookups and one
+        for the ingredients. Returns (resolved, not_found, failed_ids).
+        """
+        by_key = defaultdict(list)
+        for ingredient in batch:
+            by_key[normalize_name(ingredient.name)].append(ingredient)
+
+        answers = cached_lookups(by_key)
+        fetched = fetch_smiles_many([key for key in by_key if key not in answers])
+        record_lookups(fetched)
+        answers.update(fetched)
+
+        updated = []
+        not_found = 0
+        failed = []
+        for key, ingredients in by_key.items():
+            if key not in answers:
+                failed.extend(ingredient.id for ingredient in ingredients)
+            elif answers[key] is None:
+                not_found += len(ingredients)
+            else:
+                for ingredient in ingredients:
+                    ingredient.smiles = answers[key]
+                    updated.append(ingredient)
+
+        ActiveIngredient.objects.bulk_update(updated, ["smiles"])
+        return len(updated), not_found, failed
+
+    def save_checkpoint(self, path, state):
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
@@ -0,0 +1,60 @@
+import time
+
+import torch
+from django.core.management.base import BaseCommand
+
+from drugs.services import ddi_model
+
+
+class Command(BaseCommand):
+    help = "Trace the DDI model per sequence-length bucket and save TorchScript artifacts"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None)
+        parser.add_argument("--benchmark-runs", type=int, default=10,
+                            help="Forward passes per bucket when comparing eager and TorchScript (0 to skip)")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"📦 Tracing buckets {ddi_model.seq_buckets()} ...")
+        started = time.perf_counter()
+        ddi_model.build_torchscript(options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Saved to {ddi_model.TORCHSCRIPT_DIR} in {time.perf_counter() - started:.1f}s"
+            )
+        )
+
+        runs = options["benchmark_runs"]
+        if not runs:
+            return
+
+        eager = ddi_model.load_fp32()
+        traced = ddi_model.load_torchscript()
+        if not isinstance(traced, ddi_model.BucketedTorchScript):
+            self.stdout.write(self.style.WARNING("Artifacts did not load, skipping benchmark"))
+            return
+        traced.warmup()
+
+        tokenizer = ddi_model.load_tokenizer()
+        batch_size = options["batch_size"] or 8
+
+        with torch.no_grad():
+            for length in traced.buckets:
+                inputs = {
+                    name: torch.zeros((batch_size, length), dtype=torch.long)
+                    for name in tokenizer.model_input_names
+                }
+                inputs["attention_mask"].fill_(1)
+
+                timings = {}
+                for name, net in (("eager", eager), ("torchscript", traced)):
+                    net(**inputs)
+                    t0 = time.perf_counter()
+                    for _ in range(runs):
+                        net(**inputs)
+                    timings[name] = (time.perf_counter() - t0) / (runs * batch_size) * 1000
+
+                self.stdout.write(
+                    f"len {length:>4}: eager {timings['eager']:.2f} ms/pair, "
+                    f"torchscript {timings['torchscript']:.2f} ms/pair"
+                )
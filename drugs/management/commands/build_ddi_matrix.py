@@ -0,0 +1,152 @@
+import json
+import multiprocessing
+import os
+
+import numpy as np
+import torch
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from tqdm import tqdm
+
+from drugs.models import ActiveIngredient
+from drugs.services import ddi_model
+from drugs.services.ddi_matrix import (
+    INDEX_FILE,
+    MATRIX_FILE,
+    packed_offset,
+    packed_size,
+    reset_matrix,
+)
+from drugs.utils.artifacts import publish_version
+
+# Set per run in the parent; inherited by forked pool workers
+_job = {}
+
+
+def _init_worker(threads):
+    torch.set_num_threads(threads)
+
+
+def _score_shard(shard):
+    """
+    Score every pair (i, j), i < j, for rows [start, stop) and write the
+    scores into the partial matrix. Runs in a pool worker.
+    """
+    start, stop = shard
+    smiles = _job["smiles"]
+    n = len(smiles)
+
+    pairs = [(smiles[i], smiles[j]) for i in range(start, stop) for j in range(i + 1, n)]
+    scores = ddi_model.infer_local(pairs, _job["batch_size"])
+
+    matrix = np.load(_job["matrix_path"], mmap_mode="r+")
+    offset = packed_offset(start, start + 1, n)
+    matrix[offset:offset + len(pairs)] = [scores[pair] for pair in pairs]
+    matrix.flush()
+    del matrix
+
+    return start, stop, len(pairs)
+
+
+class Command(BaseCommand):
+    help = "Precompute DDI scores for every pair of ActiveIngredients with SMILES into a memory-mapped matrix"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", default=settings.DDI_MATRIX_PATH,
+                            help="Symlink to publish the matrix at (a new <output>.<version> directory per build)")
+        parser.add_argument("--workers", type=int, default=os.cpu_count())
+        parser.add_argument("--threads-per-worker", type=int, default=1)
+        parser.add_argument("--batch-size", type=int, default=settings.DDI_BATCH_SIZE)
+        parser.add_argument("--shard-pairs", type=int, default=50000,
+                            help="Approximate number of pairs per shard")
+
+    def handle(self, *args, **options):
+        output = options["output"]
+        if not output:
+            raise CommandError("Set DDI_MATRIX_PATH or pass --output.")
+
+        build_dir = output + ".build"
+        matrix_path = os.path.join(build_dir, MATRIX_FILE)
+        index_path = os.path.join(build_dir, INDEX_FILE)
+        progress_path = os.path.join(build_dir, "progress")
+
+        # ---- rows: one per distinct SMILES ----
+        smiles = sorted(set(
+            ActiveIngredient.objects.exclude(smiles__isnull=True)
+            .exclude(smiles="")
+            .values_list("smiles", flat=True)
+        ))
+
+        index = {
+            "model_version": ddi_model.model_version(),
+            "smiles": smiles,
+        }
+        n = len(smiles)
+        if n < 2:
+            raise CommandError("Need at least two ActiveIngredient rows with SMILES.")
+
+        # ---- resume or start over ----
+        # the progress file holds the finished "start stop" row ranges, so a
+        # resumed run may use another --shard-pairs
+        done = np.zeros(n - 1, dtype=bool)
+        if os.path.exists(index_path) and os.path.exists(matrix_path):
+            with open(index_path) as f:
+                previous = json.load(f)
+            if previous == index and os.path.exists(progress_path):
+                with open(progress_path) as f:
+                    for line in f:
+                        if line.strip():
+                            start, stop = map(int, line.split())
+                            done[start:stop] = True
+                self.stdout.write(f"↩️ Resuming, {done.sum()} of {n - 1} rows already done")
+
+        if not done.any():
+            os.makedirs(build_dir, exist_ok=True)
+            np.lib.format.open_memmap(
+                matrix_path, mode="w+", dtype=np.float16, shape=(packed_size(n),)
+            )[:] = np.nan
+            with open(index_path, "w") as f:
+                json.dump(index, f)
+            open(progress_path, "w").close()
+
+        # ---- shards of whole rows not done yet, about --shard-pairs pairs each ----
+        pending = []
+        start = 0
+        while start < n - 1:
+            if done[start]:
+                start += 1
+                continue
+            stop = start
+            count = 0
+            while stop < n - 1 and not done[stop] and count < options["shard_pairs"]:
+                count += n - stop - 1
+                stop += 1
+            pending.append((start, stop))
+            start = stop
+
+        self.stdout.write(
+            f"📐 {n} distinct SMILES, {packed_size(n)} pairs, {len(pending)} shards to go"
+        )
+
+        # load once in the parent; forked workers share the weights
+        ddi_model.load_model()
+        _job.update(smiles=smiles, batch_size=options["batch_size"], matrix_path=matrix_path)
+        connections.close_all()
+
+        ctx = multiprocessing.get_context("fork")
+        with ctx.Pool(options["workers"], _init_worker, (options["threads_per_worker"],)) as pool, \
+                open(progress_path, "a") as progress, \
+                tqdm(total=sum(packed_size(n - s) - packed_size(n - e) for s, e in pending),
+                     desc="Scoring pairs", ncols=120) as bar:
+            for start, stop, count in pool.imap_unordered(_score_shard, pending):
+                progress.write(f"{start} {stop}\n")
+                progress.flush()
+                bar.update(count)
+
+        # ---- publish: matrix and index swap in together ----
+        os.remove(progress_path)
+        version_dir = publish_version(build_dir, output)
+        reset_matrix()
+
+        self.stdout.write(self.style.SUCCESS(f"✅ DDI matrix written to {version_dir}, linked from {output}"))
@@ -0,0 +1,143 @@
+import gzip
+import heapq
+import os
+import shutil
+import tempfile
+from array import array
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from tqdm import tqdm
+
+from drugs.services.pubchem_mirror import DATA_FILE, INDEX_FILE, reset_mirror
+from drugs.utils.artifacts import publish_version
+
+
+def _name_of(line: bytes) -> bytes:
+    return line.split(b"\t", 1)[0]
+
+
+class Command(BaseCommand):
+    help = "Build the local PubChem name -> SMILES mirror from a TSV dump (optionally .gz)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("dump", help="TSV file with a name and a SMILES column, e.g. synonyms joined to SMILES")
+        parser.add_argument("--output", default=settings.PUBCHEM_MIRROR_PATH,
+                            help="Symlink to publish the mirror at (a new <output>.<version> directory per build)")
+        parser.add_argument("--name-column", type=int, default=0)
+        parser.add_argument("--smiles-column", type=int, default=1)
+        parser.add_argument("--skip-header", action="store_true")
+        parser.add_argument("--chunk-lines", type=int, default=1_000_000,
+                            help="Lines sorted in memory at a time")
+
+    def handle(self, *args, **options):
+        output = options["output"]
+        if not output:
+            raise CommandError("Set PUBCHEM_MIRROR_PATH or pass --output.")
+
+        build_dir = output + ".build"
+        shutil.rmtree(build_dir, ignore_errors=True)
+        os.makedirs(build_dir)
+
+        tmpdir = tempfile.mkdtemp(prefix="pubchem-mirror-", dir=os.path.dirname(os.path.abspath(output)))
+        try:
+            runs, read, skipped = self.write_sorted_runs(options, tmpdir)
+            self.stdout.write(f"📥 {read} lines read, {skipped} skipped, {len(runs)} sorted runs")
+
+            entries = self.merge_runs(runs, build_dir)
+            if not entries:
+                raise CommandError("The dump has no usable name/SMILES lines.")
+        finally:
+            shutil.rmtree(tmpdir)
+
+        # ---- publish: data and index swap in together ----
+        version_dir = publish_version(build_dir, output)
+        reset_mirror()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ PubChem mirror with {entries} names written to {version_dir}, linked from {output}"
+        ))
+
+    def write_sorted_runs(self, options, tmpdir):
+        """
+        External sort, phase 1: normalize lines, sort them in chunks of
+        --chunk-lines and write each chunk to its own run file.
+        """
+        name_col = options["name_column"]
+        smiles_col = options["smiles_column"]
+        opener = gzip.open if options["dump"].endswith(".gz") else open
+
+        runs = []
+        chunk = []
+        read = skipped = 0
+
+        with opener(options["dump"], "rt", encoding="utf-8", errors="replace") as f:
+            if options["skip_header"]:
+                next(f, None)
+
+            for line in tqdm(f, desc="Reading dump", unit=" lines", ncols=120):
+                read += 1
+                parts = line.rstrip("\r\n").split("\t")
+                if len(parts) <= max(name_col, smiles_col):
+                    skipped += 1
+                    continue
+
+                name = parts[name_col].strip().lower()
+                smiles = parts[smiles_col].strip()
+                if not name or not smiles:
+                    skipped += 1
+                    continue
+
+                chunk.append(f"{name}\t{smiles}\n".encode("utf-8"))
+                if len(chunk) >= options["chunk_lines"]:
+                    runs.append(self.write_run(chunk, tmpdir, len(runs)))
+                    chunk = []
+
+        if chunk:
+            runs.append(self.write_run(chunk, tmpdir, len(runs)))
+
+        return runs, read, skipped
+
+    def write_run(self, chunk, tmpdir, number):
+        # stable sort: the first SMILES seen for a name wins the merge
+        chunk.sort(key=_name_of)
+        path = os.path.join(tmpdir, f"run-{number}")
+        with open(path, "wb") as f:
+            f.writelines(chunk)
+        return path
+
+    def merge_runs(self, runs, build_dir):
+        """
+        Phase 2: k-way merge of the runs into the data file, dropping
+        duplicate names and recording every line's offset in the index.
+        """
+        files = [open(path, "rb") for path in runs]
+        offsets = array("Q")
+        entries = 0
+        position = 0
+        previous = None
+
+        try:
+            with open(os.path.join(build_dir, DATA_FILE), "wb") as data, \
+                    open(os.path.join(build_dir, INDEX_FILE), "wb") as index:
+                for line in tqdm(heapq.merge(*files, key=_name_of), desc="Merging", unit=" lines", ncols=120):
+                    name = _name_of(line)
+                    if name == previous:
+                        continue
+                    previous = name
+
+                    offsets.append(position)
+                    data.write(line)
+                    position += len(line)
+                    entries += 1
+
+                    if len(offsets) >= 1_000_000:
+                        offsets.tofile(index)
+                        offsets = array("Q")
+
+                offsets.tofile(index)
+        finally:
+            for f in files:
+                f.close()
+
+        return entries
@@ -0,0 +1,113 @@
+import multiprocessing
+import os
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from tqdm import tqdm
+
+from drugs.models import Drug, DrugAlternative
+from drugs.services.drug_details import refresh_drug_details
+from drugs.services.similarity import Incidence
+
+# Set per run in the parent; inherited by forked pool workers
+_job = {}
+
+
+def _score_block(block):
+    """
+    Top-k similar drugs for one block of incidence rows. Runs in a pool worker.
+    """
+    return _job["incidence"].top_k(block, _job["top_k"], _job["min_score"])
+
+
+class Command(BaseCommand):
+    help = "Compute DrugAlternative rows from shared active ingredients (top-k Jaccard similarity)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top-k", type=int, default=10)
+        parser.add_argument("--min-score", type=float, default=0.2,
+                            help="Minimum Jaccard similarity of the ingredient sets")
+        parser.add_argument("--all", action="store_true",
+                            help="Also compute for drugs that have alternatives from the CSV")
+        parser.add_argument("--workers", type=int, default=os.cpu_count())
+        parser.add_argument("--block-pairs", type=int, default=2_000_000,
+                            help="Approximate candidate pairs per block (bounds worker memory)")
+
+    def handle(self, *args, **options):
+        through = Drug.active_ingredients.through
+
+        self.stdout.write("📥 Loading drug ingredients...")
+        incidence = Incidence(list(through.objects.values_list("drug_id", "activeingredient_id").iterator()))
+        if len(incidence) < 2:
+            raise CommandError("Need at least two drugs with active ingredients.")
+
+        # ---- rows to compute ----
+        rows = np.arange(len(incidence))
+        if not options["all"]:
+            listed = np.fromiter(
+                DrugAlternative.objects.filter(source="csv").values_list("drug_id", flat=True).distinct(),
+                dtype=np.int64
+            )
+            rows = rows[~np.isin(incidence.drug_ids, listed)]
+
+        blocks = incidence.blocks(rows, options["block_pairs"])
+        self.stdout.write(
+            f"📐 {len(incidence)} drugs x {len(incidence.ingredient_ids)} ingredients, "
+            f"{len(rows)} to compute in {len(blocks)} blocks"
+        )
+
+        _job.update(incidence=incidence, top_k=options["top_k"], min_score=options["min_score"])
+        connections.close_all()
+
+        results = []
+        ctx = multiprocessing.get_context("fork")
+        with ctx.Pool(options["workers"]) as pool, \
+                tqdm(total=len(rows), desc="Scoring drugs", ncols=120) as bar:
+            for block, result in zip(blocks, pool.imap(_score_block, blocks)):
+                results.append(result)
+                bar.update(len(block))
+
+        # ---- write ----
+        names = dict(Drug.objects.values_list("id", "name"))
+        drug_ids = incidence.drug_ids
+        changed = set(
+            DrugAlternative.objects.filter(source="computed").values_list("drug_id", flat=True).distinct()
+        )
+
+        # swap the previous run's rows in one transaction; CSV rows win on conflicts
+        with transaction.atomic():
+            # a plain DELETE: .delete() would fetch every row to send post_delete
+            # for it, and the details are refreshed once below anyway
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"DELETE FROM {connection.ops.quote_name(DrugAlternative._meta.db_table)} WHERE source = %s",
+                    ["computed"]
+                )
+                deleted = cursor.rowcount
+
+            for block_rows, others, scores in tqdm(results, desc="Writing", ncols=120):
+                DrugAlternative.objects.bulk_create(
+                    [
+                        DrugAlternative(
+                            drug_id=int(drug_ids[row]),
+                            substitute=names[int(drug_ids[other])],
+                            match_score=round(float(score), 4),
+                            source="computed"
+                        )
+                        for row, other, score in zip(block_rows, others, scores)
+                    ],
+                    batch_size=5000,
+                    ignore_conflicts=True
+                )
+                changed.update(drug_ids[np.unique(block_rows)].tolist())
+
+            # ignore_conflicts skips pairs the CSV already has: count what landed
+            written = DrugAlternative.objects.filter(source="computed").count()
+
+        self.stdout.write("📄 Rebuilding details of affected drugs...")
+        refresh_drug_details(changed)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {written} computed alternatives written ({deleted} replaced)"
+        ))
@@ -0,0 +1,68 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from drugs.models import ActiveIngredient
+from drugs.services import ddi_model
+from drugs.utils.ddi import classify_severity
+
+
+class Command(BaseCommand):
+    help = "Compare int8-quantized DDI scores against fp32 on a sample of ingredient pairs"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sample", type=int, default=500)
+        parser.add_argument("--batch-size", type=int, default=32)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--min-agreement", type=float, default=0.99,
+                            help="Fail if fewer pairs than this share a severity class")
+
+    def handle(self, *args, **options):
+        smiles = list(
+            ActiveIngredient.objects.exclude(smiles__isnull=True)
+            .exclude(smiles="")
+            .values_list("smiles", flat=True)
+            .distinct()
+        )
+        if len(smiles) < 2:
+            raise CommandError("Need at least two ActiveIngredient rows with SMILES.")
+
+        rng = random.Random(options["seed"])
+        pairs = [tuple(rng.sample(smiles, 2)) for _ in range(options["sample"])]
+
+        self.stdout.write("📥 Loading fp32 and int8 models...")
+        ddi_model.load_tokenizer()
+        fp32 = ddi_model.load_fp32()
+        int8 = ddi_model.quantize_int8(fp32)
+
+        scores = {}
+        timings = {}
+        for name, net in (("fp32", fp32), ("int8", int8)):
+            started = time.perf_counter()
+            scores[name] = []
+            for start in range(0, len(pairs), options["batch_size"]):
+                batch = pairs[start:start + options["batch_size"]]
+                scores[name].extend(ddi_model._score_batch(batch, net))
+            timings[name] = (time.perf_counter() - started) / len(pairs) * 1000
+
+        deltas = sorted(abs(a - b) for a, b in zip(scores["fp32"], scores["int8"]))
+        agree = sum(
+            classify_severity(a) == classify_severity(b)
+            for a, b in zip(scores["fp32"], scores["int8"])
+        )
+        agreement = agree / len(pairs)
+
+        self.stdout.write(f"Pairs:               {len(pairs)}")
+        self.stdout.write(f"Mean |delta|:        {sum(deltas) / len(deltas):.5f}")
+        self.stdout.write(f"p95 |delta|:         {deltas[int(0.95 * (len(deltas) - 1))]:.5f}")
+        self.stdout.write(f"Max |delta|:         {deltas[-1]:.5f}")
+        self.stdout.write(f"Severity agreement:  {agree}/{len(pairs)} ({agreement:.2%})")
+        self.stdout.write(f"Latency per pair:    fp32 {timings['fp32']:.2f} ms, int8 {timings['int8']:.2f} ms")
+
+        if agreement < options["min_agreement"]:
+            raise CommandError(
+                f"Severity agreement {agreement:.2%} is below {options['min_agreement']:.2%}."
+            )
+
+        self.stdout.write(self.style.SUCCESS("✅ int8 backend matches fp32"))
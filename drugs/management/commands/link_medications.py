@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from drugs.models import Medication
+from drugs.services.interactions import rescore_medications
+from drugs.services.medication_links import relink_medications
+
+
+class Command(BaseCommand):
+    help = "Link Medication rows to the Drug catalog and cache their ingredient ids and SMILES"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true",
+                            help="Re-resolve every medication, not only the ones never linked")
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        queryset = Medication.objects.all()
+        if not options["all"]:
+            queryset = queryset.filter(resolved_at__isnull=True)
+
+        self.stdout.write("🔗 Linking medications...")
+        count = relink_medications(queryset, options["batch_size"], on_changed=rescore_medications)
+
+        self.stdout.write(self.style.SUCCESS(f"✅ {count} medications linked"))
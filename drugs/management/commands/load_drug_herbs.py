@@ -3,10 +3,16 @@ from pathlib import Path
 from django.conf import settings
 from django.core.management.base import BaseCommand
 from django.db import transaction
+from django.db.models.functions import Lower
 from tqdm import tqdm
 
-from drugs.models import Drug, ActiveIngredient, DrugAlternative
-from drugs.utils.parsing import parse_active_ingredients
+from drugs.models import Drug, ActiveIngredient, DrugAlternative, Medication, Herb
+from drugs.services.drug_details import refresh_drug_details
+from drugs.services.interactions import rescore_medications
+from drugs.services.medication_links import relink_medications
+from drugs.services.equivalents import refresh_ingredient_signatures
+from drugs.services.search import refresh_search_vectors
+from drugs.utils.parsing import parse_active_ingredients, parse_herbs
 
 
 CHUNK_SIZE = 5000
@@ -25,6 +31,8 @@ class Command(BaseCommand):
         # ---- preload caches ----
         drug_cache = {d.name: d for d in Drug.objects.all()}
         ai_cache = {a.name: a for a in ActiveIngredient.objects.all()}
+        # herbs are keyed by their lowercased name, as the unique constraint
+        herb_cache = {h.name.lower(): h for h in Herb.objects.all()}
         alt_cache = set(
             DrugAlternative.objects.values_list("drug__name", "substitute")
         )
@@ -32,6 +40,7 @@ class Command(BaseCommand):
         self.stdout.write(
             f"Drugs: {len(drug_cache)}, "
             f"ActiveIngredients: {len(ai_cache)}, "
+            f"Herbs: {len(herb_cache)}, "
             f"Alternatives: {len(alt_cache)}"
         )
 
@@ -45,6 +54,9 @@ class Command(BaseCommand):
             new_ais = []
             new_m2m = []
             new_alts = []
+            new_herbs = []
+            new_herb_links = []
+            imported = set()
 
             for row in tqdm(reader, total=total, desc="Importing", ncols=120):
                 # ---------------- Drug ----------------
@@ -52,6 +64,7 @@ class Command(BaseCommand):
                 if not drug_name:
                     continue
 
+                imported.add(drug_name)
                 drug = drug_cache.get(drug_name)
                 if not drug:
                     drug = Drug(name=drug_name)
@@ -86,26 +99,53 @@ class Command(BaseCommand):
                         alt._drug_name = drug_name  # temp storage
                         new_alts.append(alt)
 
+                # ---------------- Herbs ----------------
+                for herb_name in parse_herbs(row.get("Herbal_Alternatives")):
+                    herb_key = herb_name.lower()
+                    if herb_key not in herb_cache:
+                        herb = Herb(name=herb_name)
+                        herb_cache[herb_key] = herb
+                        new_herbs.append(herb)
+
+                    new_herb_links.append((herb_key, drug_name))
+
                 # ---------------- Flush ----------------
                 if len(new_drugs) >= CHUNK_SIZE:
                     self._flush(
                         new_drugs, new_ais, new_m2m, new_alts,
-                        drug_cache, ai_cache
+                        new_herbs, new_herb_links,
+                        drug_cache, ai_cache, herb_cache
                     )
                     new_drugs.clear()
                     new_ais.clear()
                     new_m2m.clear()
                     new_alts.clear()
+                    new_herbs.clear()
+                    new_herb_links.clear()
 
             # final flush
             self._flush(
                 new_drugs, new_ais, new_m2m, new_alts,
-                drug_cache, ai_cache
+                new_herbs, new_herb_links,
+                drug_cache, ai_cache, herb_cache
             )
 
+        self.stdout.write("🔎 Refreshing search vectors...")
+        refresh_search_vectors()
+
+        self.stdout.write("🧬 Refreshing ingredient signatures...")
+        refresh_ingredient_signatures()
+
+        self.stdout.write("📄 Rebuilding details of imported drugs...")
+        refresh_drug_details([drug_cache[name].id for name in imported])
+
         self.stdout.write(self.style.SUCCESS("✅ FAST import completed"))
 
-    def _flush(self, drugs, ais, m2m, alts, drug_cache, ai_cache):
+        # ---- the catalog changed: resolve active medications again ----
+        relinked = relink_medications(Medication.objects.filter(is_finished=False), on_changed=rescore_medications)
+        self.stdout.write(f"🔗 Re-linked {relinked} active medications")
+
+    def _flush(self, drugs, ais, m2m, alts, herbs, herb_links, drug_cache, ai_cache, herb_cache):
         with transaction.atomic():
             # ---- bulk create drugs & ingredients ----
             Drug.objects.bulk_create(drugs, ignore_conflicts=True)
@@ -138,3 +178,22 @@ class Command(BaseCommand):
             DrugAlternative.objects.bulk_create(
                 alts, ignore_conflicts=True
             )
+
+            # ---- herbs & herb -> drug links ----
+            Herb.objects.bulk_create(herbs, ignore_conflicts=True)
+            for h in Herb.objects.annotate(name_lower=Lower("name")).filter(
+                    name_lower__in=[h.name.lower() for h in herbs]
+            ):
+                herb_cache[h.name.lower()] = h
+
+            herb_through = Herb.drugs.through
+            herb_through.objects.bulk_create(
+                [
+                    herb_through(
+                        herb_id=herb_cache[h].id,
+                        drug_id=drug_cache[d].id
+                    )
+                    for h, d in herb_links
+                ],
+                ignore_conflicts=True
+            )
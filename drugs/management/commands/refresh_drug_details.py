@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from drugs.services.drug_details import refresh_drug_details
+
+
+class Command(BaseCommand):
+    help = "Rebuild the DrugDetail read model (catalog page documents) of every drug"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        self.stdout.write("📄 Rebuilding drug details...")
+        count = refresh_drug_details(batch_size=options["batch_size"])
+
+        self.stdout.write(self.style.SUCCESS(f"✅ {count} drug details rebuilt"))
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from drugs.services import ddi_model
+from drugs.services.ddi_server import DDIInferenceServer, MicroBatcher
+
+
+class Command(BaseCommand):
+    help = "Serve DDI predictions to all gunicorn workers from one model over a Unix socket"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--socket", default=settings.DDI_SERVER_SOCKET or "/tmp/3awn-ddi.sock")
+        parser.add_argument("--max-batch-size", type=int, default=settings.DDI_BATCH_SIZE)
+        parser.add_argument("--max-wait-ms", type=float, default=settings.DDI_SERVER_MAX_WAIT_MS)
+
+    def handle(self, *args, **options):
+        self.stdout.write("📥 Loading DDI model...")
+        ddi_model.load_model()
+
+        batcher = MicroBatcher(
+            lambda pairs: ddi_model.infer_local(pairs, options["max_batch_size"]),
+            max_batch_size=options["max_batch_size"],
+            max_wait=options["max_wait_ms"] / 1000
+        )
+        server = DDIInferenceServer(options["socket"], batcher)
+
+        self.stdout.write(self.style.SUCCESS(f"✅ DDI server listening on {options['socket']}"))
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f"Stats: {batcher.stats}")
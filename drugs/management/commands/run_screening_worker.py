@@ -0,0 +1,92 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from drugs.models import ScreeningJob
+from drugs.services import ddi_model
+from drugs.services.interactions import screen_medication
+from drugs.services.medication_links import link_medications
+
+
+class Command(BaseCommand):
+    help = "Run queued medication interaction screens (ScreeningJob rows)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--poll-interval", type=float, default=1.0,
+                            help="Seconds to sleep when the queue is empty")
+        parser.add_argument("--stale-after", type=int, default=600,
+                            help="Requeue jobs left running this many seconds (crashed worker)")
+        parser.add_argument("--max-attempts", type=int, default=3)
+        parser.add_argument("--once", action="store_true", help="Exit when the queue is empty")
+
+    def handle(self, *args, **options):
+        # with the inference server the model lives there, not in every worker
+        if not settings.DDI_SERVER_SOCKET:
+            ddi_model.load_model()
+        self.stdout.write(self.style.SUCCESS("✅ Screening worker started"))
+
+        while True:
+            close_old_connections()
+            self.requeue_stale(options["stale_after"], options["max_attempts"])
+
+            job = self.claim()
+            if job is None:
+                if options["once"]:
+                    return
+                time.sleep(options["poll_interval"])
+                continue
+
+            self.run(job)
+
+    def requeue_stale(self, stale_after, max_attempts):
+        cutoff = timezone.now() - timedelta(seconds=stale_after)
+        stale = ScreeningJob.objects.filter(status="running", started_at__lt=cutoff)
+
+        stale.filter(attempts__lt=max_attempts).update(status="pending")
+        stale.filter(attempts__gte=max_attempts).update(
+            status="failed",
+            error="Worker did not finish the screen.",
+            finished_at=timezone.now()
+        )
+
+    def claim(self):
+        # skip_locked lets several workers poll the same table
+        with transaction.atomic():
+            job = (
+                ScreeningJob.objects.select_for_update(skip_locked=True)
+                .filter(status="pending")
+                .order_by("created_at")
+                .first()
+            )
+            if job is None:
+                return None
+
+            job.status = "running"
+            job.attempts += 1
+            job.started_at = timezone.now()
+            job.save(update_fields=["status", "attempts", "started_at"])
+
+        return job
+
+    def run(self, job):
+        try:
+            # link first, as the synchronous path does
+            fuzzy = link_medications([job.medication])
+            outcome = {
+                "result": screen_medication(job.medication),
+                "name_match": fuzzy.get(job.medication_id),
+                "status": "done"
+            }
+        except Exception as exc:
+            outcome = {"error": str(exc), "status": "failed"}
+            self.stderr.write(f"❌ Screening {job.id} failed: {exc}")
+
+        # the medication (and the job with it) may have been deleted meanwhile;
+        # an UPDATE of a missing row is a no-op where save() would raise
+        updated = ScreeningJob.objects.filter(pk=job.pk).update(finished_at=timezone.now(), **outcome)
+        if not updated:
+            self.stderr.write(f"⚠️ Screening {job.id} was deleted with its medication, skipped")
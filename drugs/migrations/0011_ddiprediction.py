@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-17 01:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drugs', '0010_alter_activeingredient_smiles'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DDIPrediction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pair_key', models.CharField(max_length=64)),
+                ('model_version', models.CharField(max_length=100)),
+                ('smiles_a', models.TextField()),
+                ('smiles_b', models.TextField()),
+                ('score', models.FloatField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'unique_together': {('pair_key', 'model_version')},
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-17 01:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drugs', '0012_screeningjob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MedicationInteraction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('severity', models.CharField(max_length=10)),
+                ('model_version', models.CharField(max_length=100)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('medication_a', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='drugs.medication')),
+                ('medication_b', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='drugs.medication')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='medication_interactions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('medication_a', 'medication_b')},
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.6 on 2026-10-17 01:29
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drugs', '0014_pubchemlookup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activeingredient',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='activeingredient_name_lower'),
+        ),
+        migrations.AddIndex(
+            model_name='drug',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='drug_name_lower'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-17 01:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drugs', '0015_name_lower_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='medication',
+            name='drug',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='medications', to='drugs.drug'),
+        ),
+        migrations.AddField(
+            model_name='medication',
+            name='ingredient_ids',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='medication',
+            name='resolved_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='medication',
+            name='resolved_smiles',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
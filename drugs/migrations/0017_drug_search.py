@@ -0,0 +1,71 @@
+# Generated by Django 5.2.6 on 2026-10-17 01:37
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.operations import TrigramExtension
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery, TextField, Value
+from django.db.models.functions import Coalesce, Concat
+
+
+# a frozen copy of services.search.search_document as of this migration
+def _related_text(queryset, expression):
+    return Coalesce(
+        Subquery(
+            queryset.filter(drug_id=OuterRef("pk"))
+            .values("drug_id")
+            .annotate(text=StringAgg(expression, " "))
+            .values("text")
+        ),
+        Value(""),
+        output_field=TextField()
+    )
+
+
+def populate_search_vectors(apps, schema_editor):
+    Drug = apps.get_model("drugs", "Drug")
+    DrugAlternative = apps.get_model("drugs", "DrugAlternative")
+    through = Drug.active_ingredients.through
+
+    Drug.objects.update(search_vector=(
+        SearchVector("name", weight="A", config="simple")
+        + SearchVector(_related_text(through.objects, "activeingredient__name"), weight="B", config="simple")
+        + SearchVector(
+            _related_text(
+                DrugAlternative.objects,
+                Concat(
+                    Coalesce("drug_class", Value("")), Value(" "), Coalesce("atc_code", Value("")),
+                    output_field=TextField()
+                )
+            ),
+            weight="C", config="simple"
+        )
+        + SearchVector(_related_text(DrugAlternative.objects, "herbal_alternatives"), weight="D", config="simple")
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drugs', '0016_medication_links'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='drug',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='drug',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='drug_search_vector'),
+        ),
+        migrations.AddIndex(
+            model_name='drug',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass('name', name='gin_trgm_ops'), name='drug_name_trgm'),
+        ),
+        migrations.RunPython(populate_search_vectors, migrations.RunPython.noop),
+    ]
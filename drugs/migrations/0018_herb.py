@@ -0,0 +1,64 @@
+# Generated by Django 5.2.6 on 2026-10-17 01:42
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+# a frozen copy of utils.parsing.parse_herbs as of this migration
+def parse_herbs(raw):
+    if not raw:
+        return []
+
+    names = {}
+    for part in raw.split(","):
+        name = " ".join(part.split())
+        if name:
+            names.setdefault(name.lower(), name)
+    return list(names.values())
+
+
+def populate_herbs(apps, schema_editor):
+    Herb = apps.get_model("drugs", "Herb")
+    DrugAlternative = apps.get_model("drugs", "DrugAlternative")
+
+    links = [
+        (drug_id, herb)
+        for drug_id, raw in DrugAlternative.objects.values_list("drug_id", "herbal_alternatives").iterator()
+        for herb in parse_herbs(raw)
+    ]
+
+    # one herb per case-insensitive name, spelled as first seen
+    names = {}
+    for _, herb in links:
+        names.setdefault(herb.lower(), herb)
+
+    Herb.objects.bulk_create([Herb(name=name) for name in names.values()], ignore_conflicts=True)
+    herb_ids = {name.lower(): herb_id for name, herb_id in Herb.objects.values_list("name", "id")}
+
+    Herb.drugs.through.objects.bulk_create(
+        [Herb.drugs.through(herb_id=herb_ids[herb.lower()], drug_id=drug_id) for drug_id, herb in links],
+        batch_size=5000,
+        ignore_conflicts=True
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drugs', '0017_drug_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Herb',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('drugs', models.ManyToManyField(blank=True, related_name='herbs', to='drugs.drug')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(django.db.models.functions.text.Lower('name'), name='herb_name_lower_unique')],
+            },
+        ),
+        migrations.RunPython(populate_herbs, migrations.RunPython.noop),
+    ]
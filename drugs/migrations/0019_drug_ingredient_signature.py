@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-17 01:44
+
+from django.contrib.postgres.aggregates import StringAgg
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, TextField
+from django.db.models.functions import Cast, MD5
+
+
+# a frozen copy of services.equivalents.signature_expression as of this migration
+def populate_signatures(apps, schema_editor):
+    Drug = apps.get_model("drugs", "Drug")
+    through = Drug.active_ingredients.through
+
+    Drug.objects.update(ingredient_signature=Subquery(
+        through.objects.filter(drug_id=OuterRef("pk"))
+        .values("drug_id")
+        .annotate(signature=MD5(StringAgg(
+            Cast("activeingredient_id", TextField()), ",", ordering="activeingredient_id"
+        )))
+        .values("signature")
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drugs', '0018_herb'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='drug',
+            name='ingredient_signature',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=32, null=True),
+        ),
+        migrations.RunPython(populate_signatures, migrations.RunPython.noop),
+    ]
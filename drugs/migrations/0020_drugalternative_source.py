@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 01:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drugs', '0019_drug_ingredient_signature'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='drugalternative',
+            name='source',
+            field=models.CharField(choices=[('csv', 'CSV import'), ('computed', 'Computed')], default='csv', max_length=10),
+        ),
+    ]
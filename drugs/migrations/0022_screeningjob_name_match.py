@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 02:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drugs', '0021_drugdetail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='screeningjob',
+            name='name_match',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -1,10 +1,18 @@
+import uuid
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models.functions import Lower
 from authentication.models import User
 
 class ActiveIngredient(models.Model):
     name = models.CharField(max_length=255, unique=True)
     smiles = models.TextField(null=True, blank=True)
 
+    class Meta:
+        # case-insensitive name lookups filter on Lower("name")
+        indexes = [models.Index(Lower("name"), name="activeingredient_name_lower")]
+
     def __str__(self):
         return self.name
 
@@ -15,17 +23,34 @@ class Drug(models.Model):
         related_name="drugs",
         blank=True
     )
+    # maintained by services.search.refresh_search_vectors
+    search_vector = SearchVectorField(null=True, editable=False)
+    # md5 of the sorted ingredient ids, maintained by services.equivalents
+    ingredient_signature = models.CharField(max_length=32, null=True, blank=True, editable=False, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(Lower("name"), name="drug_name_lower"),
+            GinIndex(fields=["search_vector"], name="drug_search_vector"),
+            GinIndex(OpClass("name", name="gin_trgm_ops"), name="drug_name_trgm"),
+        ]
 
     def __str__(self):
         return f"{self.name}"
 
 class DrugAlternative(models.Model):
+    SOURCE_CHOICES = [
+        ('csv', 'CSV import'),
+        ('computed', 'Computed'),  # manage.py compute_alternatives
+    ]
+
     drug = models.ForeignKey(Drug, on_delete=models.CASCADE, related_name="alternatives")
     substitute = models.CharField(max_length=255)
     match_score = models.FloatField(null=True, blank=True)
     drug_class = models.CharField(max_length=255, null=True, blank=True)
     atc_code = models.CharField(max_length=20, null=True, blank=True)
     herbal_alternatives = models.TextField(null=True, blank=True)
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES, default='csv')
 
     class Meta:
         unique_together = ("drug", "substitute")  # 🧠 ensures skip-on-duplicate
@@ -33,6 +58,34 @@ class DrugAlternative(models.Model):
     def __str__(self):
         return f"{self.substitute} (Alternative for {self.drug.name})"
 
+class Herb(models.Model):
+    """
+    A herbal alternative, normalized out of DrugAlternative.herbal_alternatives
+    by load_drug_herbs; `drugs` are the drugs it is an alternative for.
+    The name keeps its spelling from the import; it is unique case-insensitively.
+    """
+    name = models.CharField(max_length=255)
+    drugs = models.ManyToManyField(Drug, related_name="herbs", blank=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(Lower("name"), name="herb_name_lower_unique")]
+
+    def __str__(self):
+        return self.name
+
+class DrugDetail(models.Model):
+    """
+    Read model of a drug's catalog page (ingredients, ranked alternatives,
+    herbs, classes and ATC codes) as one JSON document, so the page costs
+    a single primary-key lookup. Rebuilt by services.drug_details.
+    """
+    drug = models.OneToOneField(Drug, on_delete=models.CASCADE, primary_key=True, related_name="detail")
+    document = models.JSONField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Detail of {self.drug_id}"
+
 class Medication(models.Model):
     name = models.CharField(max_length=255, null=False, blank=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -45,6 +98,12 @@ class Medication(models.Model):
     dose_taken = models.JSONField(default=dict, blank=True)
     is_finished = models.BooleanField(default=False, blank=True)
 
+    # name resolved once against the catalog (see services.medication_links)
+    drug = models.ForeignKey(Drug, on_delete=models.SET_NULL, null=True, blank=True, related_name="medications")
+    ingredient_ids = models.JSONField(default=list, blank=True)
+    resolved_smiles = models.JSONField(default=list, blank=True)
+    resolved_at = models.DateTimeField(null=True, blank=True)
+
     def __str__(self):
         return f"{self.name} ({self.user.email})"
 
@@ -52,3 +111,83 @@ class Medication(models.Model):
         if self.time:
             self.time = self.time.replace(second=0, microsecond=0)
         super().save(*args, **kwargs)
+
+class DDIPrediction(models.Model):
+    """
+    Stored model output for an unordered SMILES pair.
+    `smiles_a` <= `smiles_b` always; `pair_key` is a hash of both.
+    """
+    pair_key = models.CharField(max_length=64)
+    model_version = models.CharField(max_length=100)
+    smiles_a = models.TextField()
+    smiles_b = models.TextField()
+    score = models.FloatField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("pair_key", "model_version")
+
+    def __str__(self):
+        return f"{self.pair_key[:12]} [{self.model_version}] = {self.score}"
+
+class ScreeningJob(models.Model):
+    """
+    Interaction screen of a new medication, run by `manage.py run_screening_worker`.
+    `result` holds the `severity_check` list once done, `name_match` the
+    fuzzy catalog match the name was linked by, if any.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    medication = models.ForeignKey(Medication, on_delete=models.CASCADE, related_name="screening_jobs")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    result = models.JSONField(null=True, blank=True)
+    name_match = models.JSONField(null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
+    attempts = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "created_at"])]
+
+    def __str__(self):
+        return f"Screening {self.id} of {self.medication.name} ({self.status})"
+
+class MedicationInteraction(models.Model):
+    """
+    Edge of a user's interaction graph between two of their active medications.
+    `medication_a` always has the lower id.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="medication_interactions")
+    medication_a = models.ForeignKey(Medication, on_delete=models.CASCADE, related_name="+")
+    medication_b = models.ForeignKey(Medication, on_delete=models.CASCADE, related_name="+")
+    score = models.FloatField()
+    severity = models.CharField(max_length=10)
+    model_version = models.CharField(max_length=100)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("medication_a", "medication_b")
+
+    def __str__(self):
+        return f"{self.medication_a.name} ↔ {self.medication_b.name} ({self.severity})"
+
+class PubChemLookup(models.Model):
+    """
+    Cached PubChem answer for a normalized name; `smiles` is null when
+    PubChem did not know it (retried after PUBCHEM_NEGATIVE_TTL).
+    """
+    name = models.CharField(max_length=255, unique=True)
+    smiles = models.TextField(null=True, blank=True)
+    fetched_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name} -> {self.smiles or '∅'}"
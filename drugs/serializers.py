@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Medication, Drug, DrugAlternative
+from .models import Medication, Drug, DrugAlternative, ScreeningJob
 from datetime import date
 
 
@@ -15,14 +15,24 @@ class DrugAlternativeSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = DrugAlternative
-        fields = ["id", "name", "active_ingredients"]
+        fields = ["id", "name", "active_ingredients", "match_score", "source"]
+
+
+class DrugSearchSerializer(serializers.ModelSerializer):
+    active_ingredients = serializers.StringRelatedField(many=True)
+    rank = serializers.FloatField(read_only=True)
+    similarity = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = Drug
+        fields = ["id", "name", "active_ingredients", "rank", "similarity"]
 
 
 class MedicationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Medication
         fields = '__all__'
-        read_only_fields = ['user']
+        read_only_fields = ['user', 'drug', 'ingredient_ids', 'resolved_smiles', 'resolved_at']
 
     def create(self, validated_data):
         today_str = date.today().isoformat()
@@ -34,3 +44,27 @@ class MedicationSerializer(serializers.ModelSerializer):
 class DDIPredictSerializer(serializers.Serializer):
     drug_a = serializers.CharField(max_length=255)
     drug_b = serializers.CharField(max_length=255)
+
+
+class AutocompleteQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=255)
+    limit = serializers.IntegerField(min_value=1, max_value=50, default=10)
+    kind = serializers.ChoiceField(choices=["drug", "active_ingredient"], required=False)
+
+
+class RegimenInteractionsSerializer(serializers.Serializer):
+    drugs = serializers.ListField(
+        child=serializers.CharField(max_length=255),
+        required=False,
+        allow_empty=False,
+        max_length=50
+    )
+    patient_id = serializers.IntegerField(required=False)
+
+
+class ScreeningJobSerializer(serializers.ModelSerializer):
+    severity_check = serializers.JSONField(source='result', read_only=True)
+
+    class Meta:
+        model = ScreeningJob
+        fields = ["id", "status", "medication", "name_match", "severity_check", "error", "created_at", "finished_at"]
@@ -1,14 +1,56 @@
+from django.db.models.functions import Lower
+
 from drugs.models import Drug, ActiveIngredient
 
 def resolve_active_ingredients(med_name: str):
     """
     Returns list of ActiveIngredient objects
     """
-    drug = Drug.objects.filter(name__iexact=med_name).first()
+    return resolve_active_ingredients_many([med_name])[med_name]
+
+
+def resolve_active_ingredients_many(names: list[str]) -> dict[str, list[ActiveIngredient]]:
+    """
+    Bulk version of resolve_active_ingredients.
+    Returns {name: [ActiveIngredient, ...]}.
+    """
+    return {name: ingredients for name, (_, ingredients) in resolve_drugs_many(names).items()}
+
+
+def resolve_drugs_many(names: list[str]) -> dict[str, tuple[Drug | None, list[ActiveIngredient]]]:
+    """
+    Match names to drugs in three queries whatever the number of names
+    (drugs, their ingredients, ingredients by name), all case-insensitive
+    through the Lower("name") indexes. A name that is not a drug but is an
+    active ingredient resolves to (None, [that ingredient]).
+    Returns {name: (Drug or None, [ActiveIngredient, ...])}.
+    """
+    keys = {name: name.strip().lower() for name in names}
+    wanted = set(keys.values())
+
+    by_drug = {
+        drug.name_lower: drug
+        for drug in Drug.objects.annotate(name_lower=Lower("name"))
+        .filter(name_lower__in=wanted)
+        .prefetch_related("active_ingredients")
+    }
+
+    # fallback: maybe the name is an active ingredient itself
+    by_ingredient = {}
+    if wanted - by_drug.keys():
+        by_ingredient = {
+            ai.name_lower: ai
+            for ai in ActiveIngredient.objects.annotate(name_lower=Lower("name"))
+            .filter(name_lower__in=wanted - by_drug.keys())
+        }
 
-    if drug:
-        return list(drug.active_ingredients.all())
+    resolved = {}
+    for name, key in keys.items():
+        drug = by_drug.get(key)
+        if drug:
+            resolved[name] = (drug, list(drug.active_ingredients.all()))
+        else:
+            ai = by_ingredient.get(key)
+            resolved[name] = (None, [ai] if ai else [])
 
-    # fallback: maybe med_name is active itself
-    ai = ActiveIngredient.objects.filter(name__iexact=med_name).first()
-    return [ai] if ai else []
+    return resolved
@@ -0,0 +1,48 @@
+from bisect import bisect_left
+
+from drugs.models import Drug, ActiveIngredient
+from drugs.services.catalog import CatalogCache
+
+KINDS = ("drug", "active_ingredient")
+
+
+class PrefixIndex:
+    """
+    Catalog names in sorted arrays (all names, and one per kind). The names
+    sharing a prefix are a contiguous run, found with one binary search.
+    """
+
+    def __init__(self, entries):
+        # entries: (name, kind, id)
+        entries = sorted(
+            (name.strip().lower(), kind, pk) for name, kind, pk in entries if name.strip()
+        )
+        self.arrays = {None: ([name for name, _, _ in entries], entries)}
+        for kind in KINDS:
+            of_kind = [entry for entry in entries if entry[1] == kind]
+            self.arrays[kind] = ([name for name, _, _ in of_kind], of_kind)
+
+    def complete(self, prefix: str, limit: int = 10, kind: str | None = None) -> list[dict]:
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+
+        keys, entries = self.arrays[kind]
+        start = bisect_left(keys, prefix)
+
+        results = []
+        for name, entry_kind, pk in entries[start:start + limit]:
+            if not name.startswith(prefix):
+                break
+            results.append({"name": name, "kind": entry_kind, "id": pk})
+        return results
+
+
+def _build_index() -> PrefixIndex:
+    return PrefixIndex(
+        [(name, "drug", pk) for pk, name in Drug.objects.values_list("id", "name").iterator()]
+        + [(name, "active_ingredient", pk) for pk, name in ActiveIngredient.objects.values_list("id", "name").iterator()]
+    )
+
+
+prefix_index = CatalogCache(_build_index)
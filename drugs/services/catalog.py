@@ -0,0 +1,52 @@
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+from drugs.models import Drug, ActiveIngredient
+
+
+def catalog_version() -> tuple:
+    """
+    Cheap signature of the Drug/ActiveIngredient catalog: changes whenever
+    rows are added or removed (e.g. by load_drug_herbs).
+    """
+    drugs = Drug.objects.aggregate(count=Count("id"), last=Max("id"))
+    ingredients = ActiveIngredient.objects.aggregate(count=Count("id"), last=Max("id"))
+    return drugs["count"], drugs["last"], ingredients["count"], ingredients["last"]
+
+
+class CatalogCache:
+    """
+    A per-process value built from the catalog by `build()`, rebuilt when
+    catalog_version() changes. The version is checked at most every
+    CATALOG_REFRESH_SECONDS, so most reads cost no query at all.
+    """
+
+    def __init__(self, build):
+        self._build = build
+        self._value = None
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self._value is not None and time.monotonic() - self._checked_at < settings.CATALOG_REFRESH_SECONDS:
+            return self._value
+
+        with self._lock:
+            now = time.monotonic()
+            if self._value is None or now - self._checked_at >= settings.CATALOG_REFRESH_SECONDS:
+                version = catalog_version()
+                if self._value is None or version != self._version:
+                    self._value = self._build()
+                    self._version = version
+                self._checked_at = now
+
+        return self._value
+
+    def reset(self):
+        with self._lock:
+            self._value = None
+            self._version = None
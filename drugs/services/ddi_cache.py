@@ -0,0 +1,51 @@
+import hashlib
+
+from drugs.models import DDIPrediction
+
+
+def normalize_pair(smiles1: str, smiles2: str) -> tuple[str, str]:
+    """
+    Order-independent form of a SMILES pair: (a, b) and (b, a) map to the same key.
+    """
+    return (smiles1, smiles2) if smiles1 <= smiles2 else (smiles2, smiles1)
+
+
+def pair_key(smiles1: str, smiles2: str) -> str:
+    a, b = normalize_pair(smiles1, smiles2)
+    return hashlib.sha256(f"{a}\n{b}".encode("utf-8")).hexdigest()
+
+
+def get_cached_scores(pairs, model_version: str) -> dict[tuple[str, str], float]:
+    """
+    Look up stored scores for many pairs in one query.
+    Returns {normalized pair: score} for the pairs that were found.
+    """
+    keys = {pair_key(s1, s2): normalize_pair(s1, s2) for s1, s2 in pairs}
+    if not keys:
+        return {}
+
+    rows = DDIPrediction.objects.filter(
+        model_version=model_version,
+        pair_key__in=list(keys)
+    ).values_list("pair_key", "score")
+
+    return {keys[key]: score for key, score in rows}
+
+
+def store_scores(scores: dict[tuple[str, str], float], model_version: str) -> None:
+    """
+    Persist freshly computed scores. Pairs already stored (e.g. by another
+    worker racing on the same pair) are skipped.
+    """
+    rows = []
+    for (s1, s2), score in scores.items():
+        a, b = normalize_pair(s1, s2)
+        rows.append(DDIPrediction(
+            pair_key=pair_key(a, b),
+            model_version=model_version,
+            smiles_a=a,
+            smiles_b=b,
+            score=score
+        ))
+
+    DDIPrediction.objects.bulk_create(rows, ignore_conflicts=True)
@@ -0,0 +1,80 @@
+import json
+import os
+import socket
+import threading
+
+
+class DDIServerError(Exception):
+    pass
+
+
+class DDIServerClient:
+    """
+    Talks to `manage.py run_ddi_server` over its Unix socket using
+    newline-delimited JSON. One connection per process, reopened after
+    fork or when the server drops it.
+    """
+
+    def __init__(self, socket_path: str, timeout: float = 30.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._sock = None
+        self._file = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+
+        self._sock = sock
+        self._file = sock.makefile("rwb")
+        self._pid = os.getpid()
+
+    def close(self):
+        for resource in (self._file, self._sock):
+            if resource is not None:
+                try:
+                    resource.close()
+                except OSError:
+                    pass
+        self._sock = None
+        self._file = None
+
+    def _roundtrip(self, payload: bytes) -> bytes:
+        # a connection inherited through fork is shared with the parent
+        if self._sock is None or self._pid != os.getpid():
+            self._sock = None
+            self._connect()
+
+        self._file.write(payload)
+        self._file.flush()
+        return self._file.readline()
+
+    def score(self, pairs: list[tuple[str, str]]) -> list[float]:
+        payload = json.dumps({"pairs": [list(pair) for pair in pairs]}).encode("utf-8") + b"\n"
+
+        with self._lock:
+            # retry once: the kept-alive connection may be stale after a server restart
+            for attempt in range(2):
+                try:
+                    line = self._roundtrip(payload)
+                except OSError:
+                    self.close()
+                    if attempt:
+                        raise
+                    continue
+
+                if line:
+                    break
+
+                self.close()
+                if attempt:
+                    raise DDIServerError("Connection closed by DDI server.")
+
+        response = json.loads(line)
+        if "error" in response:
+            raise DDIServerError(response["error"])
+
+        return response["scores"]
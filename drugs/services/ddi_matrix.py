@@ -0,0 +1,100 @@
+import json
+import os
+
+import numpy as np
+from django.conf import settings
+
+from drugs.utils.artifacts import current_version
+
+MATRIX_FILE = "matrix.npy"
+INDEX_FILE = "index.json"
+
+_matrix = None
+_loaded = False
+_identity = None
+
+
+def packed_size(n: int) -> int:
+    return n * (n - 1) // 2
+
+
+def packed_offset(i: int, j: int, n: int) -> int:
+    """
+    Position of (i, j), i < j, in the row-major upper triangle without the
+    diagonal. Rows are contiguous, so a range of rows is one slice.
+    """
+    return i * (2 * n - i - 1) // 2 + (j - i - 1)
+
+
+class DDIMatrix:
+    """
+    Read-only view over a precomputed all-pairs score matrix
+    (see `manage.py build_ddi_matrix`).
+
+    The scores are a memory-mapped float16 array, so every worker reads the
+    same page-cache pages and a lookup is one index computation.
+    `directory` is one published version, holding both files.
+    """
+
+    def __init__(self, directory: str):
+        with open(os.path.join(directory, INDEX_FILE)) as f:
+            index = json.load(f)
+
+        self.model_version = index["model_version"]
+        self.size = len(index["smiles"])
+        self.row_by_smiles = {smiles: row for row, smiles in enumerate(index["smiles"])}
+        self.scores = np.load(os.path.join(directory, MATRIX_FILE), mmap_mode="r")
+
+        if len(self.scores) != packed_size(self.size):
+            raise ValueError(
+                f"DDI matrix in {directory} has {len(self.scores)} scores, "
+                f"its index needs {packed_size(self.size)}"
+            )
+
+    def _score_rows(self, i: int, j: int) -> float | None:
+        if i == j:
+            return None
+        if i > j:
+            i, j = j, i
+
+        score = float(self.scores[packed_offset(i, j, self.size)])
+        if np.isnan(score):
+            return None
+        return round(score, 4)
+
+    def score(self, smiles1: str, smiles2: str) -> float | None:
+        i = self.row_by_smiles.get(smiles1)
+        j = self.row_by_smiles.get(smiles2)
+        if i is None or j is None:
+            return None
+        return self._score_rows(i, j)
+
+
+def get_matrix(model_version: str) -> DDIMatrix | None:
+    """
+    The matrix at DDI_MATRIX_PATH, reopened when build_ddi_matrix publishes
+    a new version. None when not configured, not built yet, or built by
+    another model version.
+    """
+    global _matrix, _loaded, _identity
+
+    path = settings.DDI_MATRIX_PATH
+    # every build is a new version directory behind the DDI_MATRIX_PATH symlink
+    identity = current_version(path) if path else None
+
+    if not _loaded or identity != _identity:
+        _loaded = True
+        _identity = identity
+        _matrix = DDIMatrix(path) if identity else None
+
+    if _matrix is None or _matrix.model_version != model_version:
+        return None
+    return _matrix
+
+
+def reset_matrix():
+    global _matrix, _loaded, _identity
+
+    _matrix = None
+    _loaded = False
+    _identity = None
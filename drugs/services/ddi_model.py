@@ -1,57 +1,542 @@
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
+from transformers import AutoConfig, AutoTokenizer, AutoModelForSequenceClassification
+from transformers.modeling_utils import no_init_weights
 from huggingface_hub import snapshot_download
+import transformers
+from django.conf import settings
+from collections import OrderedDict
+from types import SimpleNamespace
+import gc
+import json
+import logging
+import tempfile
+import threading
+import time
 import torch
 import os
 
+from drugs.services.ddi_cache import normalize_pair, get_cached_scores, store_scores
+from drugs.services.ddi_client import DDIServerClient, DDIServerError
+from drugs.services.ddi_matrix import get_matrix, reset_matrix
+
+logger = logging.getLogger(__name__)
+
 HF_REPO = "0xCode/3AWN"
 HF_CACHE_DIR = "/tmp/hf_models"
+INT8_ARTIFACT = "ddi_int8.pt"
+TORCHSCRIPT_DIR = os.path.join(HF_CACHE_DIR, "torchscript")
+MAX_LENGTH = 256
 
 tokenizer = None
 model = None
+server_client = None
+model_info = {"backend": None, "mode": None, "load_seconds": None, "warmup_seconds": None, "preloaded": False}
 
+WARMUP_PAIR = ("CC(=O)Nc1ccc(O)cc1", "CC(C)Cc1ccc(cc1)C(C)C(=O)O")
 
-def load_model():
-    global tokenizer, model
 
-    if model is None:
+class LRUCache:
+    """
+    Thread-safe bounded mapping that evicts the least recently used entry.
+    Keeps hit / miss / eviction counters for `cache_stats()`.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+# pair scores, keyed by the normalized (order-independent) pair
+score_cache = LRUCache(settings.DDI_SCORE_CACHE_SIZE)
+# token ids of a single SMILES string, without special tokens
+encoding_cache = LRUCache(settings.DDI_ENCODING_CACHE_SIZE)
+
+_reload_hooks = []
+
+
+def on_model_reload(hook):
+    """
+    Register a callable to run whenever the model is reloaded,
+    e.g. to drop anything derived from the previous weights.
+    """
+    _reload_hooks.append(hook)
+    return hook
 
-        if not os.path.exists(HF_CACHE_DIR):
-            snapshot_download(
-                repo_id=HF_REPO,
-                local_dir=HF_CACHE_DIR,
-                local_dir_use_symlinks=False
-            )
+
+on_model_reload(score_cache.clear)
+on_model_reload(encoding_cache.clear)
+on_model_reload(reset_matrix)
+
+
+def cache_stats() -> dict:
+    return {
+        "scores": score_cache.stats(),
+        "encodings": encoding_cache.stats(),
+    }
+
+
+def _download():
+    if not os.path.exists(HF_CACHE_DIR):
+        snapshot_download(
+            repo_id=HF_REPO,
+            local_dir=HF_CACHE_DIR,
+            local_dir_use_symlinks=False
+        )
+
+
+def load_tokenizer():
+    global tokenizer
+
+    if tokenizer is None:
+        _download()
 
         tokenizer = AutoTokenizer.from_pretrained(
             HF_CACHE_DIR,
             local_files_only=True
         )
 
-        model = AutoModelForSequenceClassification.from_pretrained(
-            HF_CACHE_DIR,
-            local_files_only=True
+        # pairs are assembled from cached per-SMILES ids, so padding
+        # pre-tokenized encodings is intended
+        tokenizer.deprecation_warnings["Asking-to-pad-a-fast-tokenizer"] = True
+
+    return tokenizer
+
+
+def load_fp32():
+    _download()
+
+    net = AutoModelForSequenceClassification.from_pretrained(
+        HF_CACHE_DIR,
+        local_files_only=True
+    )
+
+    net.to("cpu")
+    net.eval()
+    return net
+
+
+def quantize_int8(net):
+    """
+    Dynamic int8 quantization of the Linear layers (weights stored as int8,
+    activations quantized on the fly). Returns a new module; `net` is untouched.
+    """
+    return torch.ao.quantization.quantize_dynamic(
+        net,
+        {torch.nn.Linear},
+        dtype=torch.qint8
+    )
+
+
+def _artifact_stamp() -> dict:
+    # a saved artifact is only reused by the same weights and library versions
+    return {
+        "model_version": settings.DDI_MODEL_VERSION,
+        "torch": str(torch.__version__),
+        "transformers": transformers.__version__,
+    }
+
+
+def _int8_skeleton():
+    """
+    The quantized module layout without reading the fp32 weights: built
+    from the config, left uninitialized, to be filled by load_state_dict.
+    """
+    _download()
+
+    config = AutoConfig.from_pretrained(HF_CACHE_DIR, local_files_only=True)
+    with no_init_weights():
+        net = AutoModelForSequenceClassification.from_config(config)
+
+    # quantize_dynamic takes each weight's range: uninitialized memory may hold NaNs
+    for module in net.modules():
+        if isinstance(module, torch.nn.Linear):
+            module.weight.data.zero_()
+
+    net.eval()
+    return quantize_int8(net)
+
+
+def load_int8():
+    path = os.path.join(HF_CACHE_DIR, INT8_ARTIFACT)
+
+    # only tensors and plain data are saved and loaded (weights_only), never a pickled module
+    if settings.DDI_INT8_CACHE and os.path.exists(path):
+        try:
+            saved = torch.load(path, weights_only=True)
+            if saved["stamp"] == _artifact_stamp():
+                net = _int8_skeleton()
+                net.load_state_dict(saved["state_dict"])
+                return net
+        except Exception:
+            logger.warning("Ignoring unreadable int8 artifact %s", path, exc_info=True)
+
+    net = quantize_int8(load_fp32())
+
+    if settings.DDI_INT8_CACHE:
+        # workers may boot at once: write a private file, then rename it into place
+        fd, tmp_path = tempfile.mkstemp(dir=HF_CACHE_DIR, prefix=INT8_ARTIFACT + ".")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                torch.save({"stamp": _artifact_stamp(), "state_dict": net.state_dict()}, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    return net
+
+
+def seq_buckets() -> list[int]:
+    buckets = sorted({int(length) for length in settings.DDI_SEQ_BUCKETS})
+    if not buckets or buckets[-1] < MAX_LENGTH:
+        buckets.append(MAX_LENGTH)
+    return buckets
+
+
+class BucketedTorchScript:
+    """
+    Frozen TorchScript forward passes, one per fixed sequence length.
+    Inputs are padded up to the smallest bucket that fits them. Returns an
+    object with `.logits`, like the eager HF model.
+    """
+
+    def __init__(self, modules: dict[int, torch.jit.ScriptModule], pad_token_id: int, input_names: list[str]):
+        self.modules = modules
+        self.buckets = sorted(modules)
+        self.pad_token_id = pad_token_id
+        self.input_names = input_names
+
+    def __call__(self, **inputs):
+        length = inputs["input_ids"].shape[1]
+        bucket = next(b for b in self.buckets if b >= length)
+
+        padded = {
+            name: torch.nn.functional.pad(
+                tensor,
+                (0, bucket - length),
+                value=self.pad_token_id if name == "input_ids" else 0
+            )
+            for name, tensor in inputs.items()
+        }
+
+        return SimpleNamespace(logits=self.modules[bucket](**padded)[0])
+
+    def warmup(self, runs: int = 2):
+        # the profiling executor specializes each graph on its first calls
+        with torch.no_grad():
+            for length in self.buckets:
+                inputs = {name: torch.zeros((1, length), dtype=torch.long) for name in self.input_names}
+                inputs["attention_mask"].fill_(1)
+                for _ in range(runs):
+                    self.modules[length](**inputs)
+
+
+def _torchscript_stamp() -> dict:
+    return {
+        **_artifact_stamp(),
+        "cpu": torch.backends.cpu.get_cpu_capability(),
+        "buckets": seq_buckets(),
+        "inputs": list(load_tokenizer().model_input_names),
+    }
+
+
+def build_torchscript(batch_size: int | None = None) -> dict:
+    """
+    Trace the model once per sequence bucket, freeze and save the modules
+    under TORCHSCRIPT_DIR with a manifest used to detect stale artifacts.
+    """
+    load_tokenizer()
+    _download()
+
+    net = AutoModelForSequenceClassification.from_pretrained(
+        HF_CACHE_DIR,
+        local_files_only=True,
+        torchscript=True
+    )
+    net.eval()
+
+    batch_size = batch_size or settings.DDI_BATCH_SIZE
+    os.makedirs(TORCHSCRIPT_DIR, exist_ok=True)
+
+    for length in seq_buckets():
+        example = {
+            name: torch.zeros((batch_size, length), dtype=torch.long)
+            for name in tokenizer.model_input_names
+        }
+        example["input_ids"].fill_(tokenizer.pad_token_id)
+        example["attention_mask"][:, :length // 2] = 1
+
+        with torch.no_grad():
+            traced = torch.jit.trace(net, example_kwarg_inputs=example)
+            traced = torch.jit.optimize_for_inference(torch.jit.freeze(traced.eval()))
+
+        torch.jit.save(traced, os.path.join(TORCHSCRIPT_DIR, f"bucket_{length}.pt"))
+
+    manifest = _torchscript_stamp()
+    with open(os.path.join(TORCHSCRIPT_DIR, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest
+
+
+def load_torchscript():
+    """
+    Load the saved bucket modules, or fall back to the eager fp32 model when
+    they are missing or were built for other weights / library versions.
+    """
+    try:
+        with open(os.path.join(TORCHSCRIPT_DIR, "manifest.json")) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        logger.warning("No TorchScript artifacts in %s, using eager mode", TORCHSCRIPT_DIR)
+        return load_fp32()
+
+    if manifest != _torchscript_stamp():
+        logger.warning("TorchScript artifacts in %s are stale, using eager mode", TORCHSCRIPT_DIR)
+        return load_fp32()
+
+    modules = {
+        length: torch.jit.load(os.path.join(TORCHSCRIPT_DIR, f"bucket_{length}.pt"))
+        for length in manifest["buckets"]
+    }
+    return BucketedTorchScript(modules, tokenizer.pad_token_id, manifest["inputs"])
+
+
+BACKENDS = {
+    "fp32": load_fp32,
+    "int8": load_int8,
+    "torchscript": load_torchscript,
+}
+
+
+def load_model():
+    global model
+
+    if model is None:
+        started = time.perf_counter()
+
+        backend = settings.DDI_BACKEND
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown DDI_BACKEND {backend!r}, expected one of {sorted(BACKENDS)}.")
+
+        load_tokenizer()
+        model = BACKENDS[backend]()
+
+        model_info["backend"] = backend
+        model_info["mode"] = "torchscript" if isinstance(model, BucketedTorchScript) else "eager"
+        model_info["load_seconds"] = round(time.perf_counter() - started, 3)
+
+        # the torchscript backend runs eager when its artifacts are missing or stale
+        logger.info(
+            "DDI model loaded in pid %s: backend=%s mode=%s (%ss)",
+            os.getpid(), backend, model_info["mode"], model_info["load_seconds"]
         )
 
-        model.to("cpu")
-        model.eval()
 
+def preload():
+    """
+    Load and warm up the model in the gunicorn master before workers fork
+    (see gunicorn.conf.py). Workers start warm, and the weight tensors,
+    which are only ever read, stay in copy-on-write pages shared with the master.
+    """
+    load_model()
+
+    # warm up single-threaded: an intra-op thread pool started in the master
+    # would not survive the fork
+    threads = torch.get_num_threads()
+    torch.set_num_threads(1)
+    started = time.perf_counter()
+    try:
+        _score_batch([WARMUP_PAIR])
+        if isinstance(model, BucketedTorchScript):
+            model.warmup()
+    finally:
+        torch.set_num_threads(threads)
+    model_info["warmup_seconds"] = round(time.perf_counter() - started, 3)
+
+    # objects allocated so far are never collected; keeps the GC from
+    # writing to (and so un-sharing) their pages in the workers
+    gc.collect()
+    gc.freeze()
+
+    model_info["preloaded"] = True
+    return model_info
 
-def predict_ddi(smiles1: str, smiles2: str) -> float:
 
+def reload_model():
+    """
+    Drop the loaded weights, load them again and invalidate everything
+    computed from the old ones.
+    """
+    global tokenizer, model
+
+    tokenizer = None
+    model = None
     load_model()
 
-    inputs = tokenizer(
-        smiles1,
-        smiles2,
-        return_tensors="pt",
-        truncation=True,
-        padding=True,
-        max_length=256
-    )
+    for hook in _reload_hooks:
+        hook()
+
+
+def _encode(smiles: str) -> list[int]:
+    ids = encoding_cache.get(smiles)
+    if ids is None:
+        ids = tokenizer(smiles, add_special_tokens=False)["input_ids"]
+        encoding_cache.set(smiles, ids)
+    return ids
+
+
+def _score_batch(batch: list[tuple[str, str]], net=None) -> list[float]:
+    """
+    Run one forward pass over a batch of SMILES pairs, on `net` or the loaded model.
+    Padding is to the longest pair in the batch, not to MAX_LENGTH.
+    """
+    encodings = [
+        tokenizer.prepare_for_model(
+            _encode(s1),
+            _encode(s2),
+            truncation=True,
+            max_length=MAX_LENGTH
+        )
+        for s1, s2 in batch
+    ]
+    inputs = tokenizer.pad(encodings, padding=True, return_tensors="pt")
 
     with torch.no_grad():
-        outputs = model(**inputs)
-        probs = torch.softmax(outputs.logits, dim=1)
-        prob = probs[0, 1].item()
+        outputs = (model if net is None else net)(**inputs)
+        probs = torch.softmax(outputs.logits, dim=1)[:, 1]
+
+    return [round(prob, 4) for prob in probs.tolist()]
+
+
+def model_version() -> str:
+    """
+    Identifies the weights producing scores; stored scores are keyed by it.
+    int8 scores differ slightly from fp32, so they get their own key;
+    TorchScript runs the same fp32 weights and shares it.
+    """
+    if settings.DDI_BACKEND != "int8":
+        return settings.DDI_MODEL_VERSION
+    return f"{settings.DDI_MODEL_VERSION}:{settings.DDI_BACKEND}"
+
+
+def infer_local(pairs: list[tuple[str, str]], batch_size: int | None = None) -> dict[tuple[str, str], float]:
+    """
+    Score pairs with the model loaded in this process.
+    """
+    load_model()
+
+    batch_size = batch_size or settings.DDI_BATCH_SIZE
+
+    # Sort by length so each batch pads to similar sizes
+    pairs = sorted(pairs, key=lambda p: len(p[0]) + len(p[1]))
+
+    scores = {}
+    for start in range(0, len(pairs), batch_size):
+        batch = pairs[start:start + batch_size]
+        scores.update(zip(batch, _score_batch(batch)))
+
+    return scores
+
 
-    return round(prob, 4)
+def _infer(pairs: list[tuple[str, str]], batch_size: int | None = None) -> dict[tuple[str, str], float]:
+    """
+    Score pairs on the shared DDI server when DDI_SERVER_SOCKET is set.
+    If it cannot be reached the batch fails with DDIServerError, unless
+    DDI_SERVER_FALLBACK allows loading the model in this process instead.
+    """
+    global server_client
+
+    if settings.DDI_SERVER_SOCKET:
+        if server_client is None:
+            server_client = DDIServerClient(settings.DDI_SERVER_SOCKET, settings.DDI_SERVER_TIMEOUT)
+
+        try:
+            return dict(zip(pairs, server_client.score(pairs)))
+        except (OSError, DDIServerError) as exc:
+            if not settings.DDI_SERVER_FALLBACK:
+                raise DDIServerError(f"DDI server unavailable: {exc}") from exc
+            logger.warning("DDI server unavailable, scoring in-process", exc_info=True)
+
+    return infer_local(pairs, batch_size)
+
+
+def predict_ddi_batch(pairs, batch_size: int | None = None) -> list[float]:
+    """
+    Score many (smiles1, smiles2) pairs at once.
+    Returns one probability per pair, in the same order as `pairs`.
+
+    Pairs are order-independent: (a, b) and (b, a) get the same score.
+    Lookup order: precomputed matrix, in-process LRU, the shared DB table,
+    then the model.
+    """
+    pairs = [normalize_pair(s1, s2) for s1, s2 in pairs]
+    if not pairs:
+        return []
+
+    version = model_version()
+    matrix = get_matrix(version)
+
+    scores = {}
+    for pair in set(pairs):
+        score = matrix.score(*pair) if matrix else None
+        if score is None:
+            score = score_cache.get(pair)
+        if score is not None:
+            scores[pair] = score
+
+    unseen = [pair for pair in set(pairs) if pair not in scores]
+    if unseen:
+        found = get_cached_scores(unseen, version)
+
+        missing = [pair for pair in unseen if pair not in found]
+        if missing:
+            computed = _infer(missing, batch_size)
+            store_scores(computed, version)
+            found.update(computed)
+
+        for pair, score in found.items():
+            score_cache.set(pair, score)
+        scores.update(found)
+
+    return [scores[pair] for pair in pairs]
+
+
+def predict_ddi(smiles1: str, smiles2: str) -> float:
+    return predict_ddi_batch([(smiles1, smiles2)])[0]
@@ -0,0 +1,142 @@
+import json
+import logging
+import os
+import socketserver
+import threading
+import time
+from concurrent.futures import Future
+
+from drugs.services.ddi_cache import normalize_pair
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Collects pairs submitted from many connections and scores them together.
+
+    Pairs are grouped by length bucket so a batch pads to similar sizes.
+    A bucket is flushed once it holds `max_batch_size` pairs or its oldest
+    pair has waited `max_wait` seconds. A pair already queued or being
+    scored is not queued again; its callers share one Future.
+    """
+
+    def __init__(self, infer, max_batch_size: int, max_wait: float, bucket_width: int = 64):
+        self._infer = infer
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.bucket_width = bucket_width
+
+        self._cond = threading.Condition()
+        self._buckets = {}  # bucket -> [(enqueued_at, pair)]
+        self._inflight = {}  # pair -> Future
+        self.stats = {"requested": 0, "coalesced": 0, "batches": 0}
+
+        self._thread = threading.Thread(target=self._run, name="ddi-batcher", daemon=True)
+        self._thread.start()
+
+    def _bucket(self, pair) -> int:
+        return (len(pair[0]) + len(pair[1])) // self.bucket_width
+
+    def submit(self, pairs) -> list[Future]:
+        futures = []
+        now = time.monotonic()
+
+        with self._cond:
+            for pair in pairs:
+                self.stats["requested"] += 1
+
+                future = self._inflight.get(pair)
+                if future is not None:
+                    self.stats["coalesced"] += 1
+                else:
+                    future = Future()
+                    self._inflight[pair] = future
+                    self._buckets.setdefault(self._bucket(pair), []).append((now, pair))
+
+                futures.append(future)
+
+            self._cond.notify()
+
+        return futures
+
+    def _next_batch(self) -> list[tuple[str, str]]:
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                timeout = None
+
+                # oldest bucket first
+                for bucket, items in sorted(self._buckets.items(), key=lambda kv: kv[1][0][0]):
+                    deadline = items[0][0] + self.max_wait
+
+                    if len(items) >= self.max_batch_size or now >= deadline:
+                        batch = items[:self.max_batch_size]
+                        rest = items[self.max_batch_size:]
+                        if rest:
+                            self._buckets[bucket] = rest
+                        else:
+                            del self._buckets[bucket]
+                        return [pair for _, pair in batch]
+
+                    remaining = deadline - now
+                    timeout = remaining if timeout is None else min(timeout, remaining)
+
+                self._cond.wait(timeout)
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+
+            try:
+                scores = self._infer(batch)
+                error = None
+            except Exception as exc:
+                logger.exception("DDI batch of %d pairs failed", len(batch))
+                scores = {}
+                error = exc
+
+            with self._cond:
+                self.stats["batches"] += 1
+                for pair in batch:
+                    future = self._inflight.pop(pair)
+                    if error is None:
+                        future.set_result(scores[pair])
+                    else:
+                        future.set_exception(error)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                pairs = [normalize_pair(s1, s2) for s1, s2 in request["pairs"]]
+                futures = self.server.batcher.submit(pairs)
+                response = {"scores": [future.result() for future in futures]}
+            except Exception as exc:
+                response = {"error": str(exc)}
+
+            self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+
+class DDIInferenceServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Owns the one copy of the model; gunicorn workers send it pairs through
+    `DDIServerClient`. One thread per connection, one batching thread.
+    """
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, batcher: MicroBatcher):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+        self.batcher = batcher
+        super().__init__(socket_path, _Handler)
+        os.chmod(socket_path, 0o660)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
@@ -0,0 +1,108 @@
+from collections import defaultdict
+
+from django.db.models import F
+
+from drugs.models import Drug, DrugAlternative, DrugDetail, Herb
+
+
+def build_documents(drug_ids) -> dict[int, dict]:
+    """
+    The DrugDetail documents of the given drugs, in four queries whatever
+    the number of drugs. Alternatives are ranked like DrugAlternativesView.
+    Returns {drug id: document}.
+    """
+    drugs = dict(Drug.objects.filter(id__in=drug_ids).values_list("id", "name"))
+
+    ingredients = defaultdict(list)
+    for drug_id, ai_id, name in (
+        Drug.active_ingredients.through.objects.filter(drug_id__in=drugs)
+        .order_by("activeingredient__name")
+        .values_list("drug_id", "activeingredient_id", "activeingredient__name")
+    ):
+        ingredients[drug_id].append({"id": ai_id, "name": name})
+
+    alternatives = defaultdict(list)
+    classes = defaultdict(dict)
+    atc_codes = defaultdict(dict)
+    for alt in (
+        DrugAlternative.objects.filter(drug_id__in=drugs)
+        .order_by(F("match_score").desc(nulls_last=True), "substitute")
+        .values("drug_id", "substitute", "match_score", "source", "drug_class", "atc_code")
+    ):
+        alternatives[alt["drug_id"]].append({
+            "name": alt["substitute"],
+            "match_score": alt["match_score"],
+            "source": alt["source"],
+        })
+        # ordered sets
+        if alt["drug_class"]:
+            classes[alt["drug_id"]][alt["drug_class"]] = None
+        if alt["atc_code"]:
+            atc_codes[alt["drug_id"]][alt["atc_code"]] = None
+
+    herbs = defaultdict(list)
+    for drug_id, name in (
+        Herb.drugs.through.objects.filter(drug_id__in=drugs)
+        .order_by("herb__name")
+        .values_list("drug_id", "herb__name")
+    ):
+        herbs[drug_id].append(name)
+
+    return {
+        drug_id: {
+            "id": drug_id,
+            "name": name,
+            "active_ingredients": ingredients[drug_id],
+            "alternatives": alternatives[drug_id],
+            "herbal_alternatives": herbs[drug_id],
+            "drug_classes": list(classes[drug_id]),
+            "atc_codes": list(atc_codes[drug_id]),
+        }
+        for drug_id, name in drugs.items()
+    }
+
+
+def _id_batches(drug_ids, batch_size: int):
+    if drug_ids is not None:
+        drug_ids = sorted(set(drug_ids))
+        for i in range(0, len(drug_ids), batch_size):
+            yield drug_ids[i:i + batch_size]
+        return
+
+    last_id = 0
+    while True:
+        batch = list(Drug.objects.filter(id__gt=last_id).order_by("id").values_list("id", flat=True)[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1]
+
+
+def refresh_drug_details(drug_ids=None, batch_size: int = 1000) -> int:
+    """
+    Rebuild the DrugDetail documents of the given drugs, or of all of them,
+    in batches of ids, upserting each batch. Returns the number rebuilt.
+    """
+    count = 0
+    for batch in _id_batches(drug_ids, batch_size):
+        documents = build_documents(batch)
+        DrugDetail.objects.bulk_create(
+            [DrugDetail(drug_id=drug_id, document=document) for drug_id, document in documents.items()],
+            update_conflicts=True,
+            unique_fields=["drug"],
+            update_fields=["document", "updated_at"]
+        )
+        count += len(documents)
+    return count
+
+
+def drug_detail(drug_id: int) -> dict | None:
+    """
+    The stored document: one primary-key lookup. A drug without one yet
+    (added since the last rebuild) gets it built on first request.
+    None when there is no such drug.
+    """
+    document = DrugDetail.objects.filter(drug_id=drug_id).values_list("document", flat=True).first()
+    if document is None and refresh_drug_details([drug_id]):
+        document = DrugDetail.objects.filter(drug_id=drug_id).values_list("document", flat=True).first()
+    return document
@@ -0,0 +1,49 @@
+from django.contrib.postgres.aggregates import StringAgg
+from django.db.models import OuterRef, Subquery, TextField
+from django.db.models.functions import Cast, MD5
+
+from drugs.models import Drug
+
+
+def signature_expression():
+    """
+    Drug.ingredient_signature: md5 of the drug's ingredient ids, sorted
+    and comma-joined; NULL for a drug without ingredients. Drugs with the
+    same signature have exactly the same active-ingredient set.
+    """
+    through = Drug.active_ingredients.through
+
+    return Subquery(
+        through.objects.filter(drug_id=OuterRef("pk"))
+        .values("drug_id")
+        .annotate(signature=MD5(StringAgg(
+            Cast("activeingredient_id", TextField()), ",", ordering="activeingredient_id"
+        )))
+        .values("signature")
+    )
+
+
+def refresh_ingredient_signatures(drug_ids=None) -> int:
+    """
+    Recompute Drug.ingredient_signature in one UPDATE, for the given drugs
+    or all of them (e.g. after load_drug_herbs). Returns the number of rows.
+    """
+    drugs = Drug.objects.all()
+    if drug_ids is not None:
+        drugs = drugs.filter(id__in=drug_ids)
+    return drugs.update(ingredient_signature=signature_expression())
+
+
+def equivalent_drugs(drug: Drug):
+    """
+    Other drugs with the identical active-ingredient set (generic
+    equivalents): one equality lookup on the signature index.
+    """
+    if not drug.ingredient_signature:
+        return Drug.objects.none()
+
+    return (
+        Drug.objects.filter(ingredient_signature=drug.ingredient_signature)
+        .exclude(id=drug.id)
+        .order_by("name")
+    )
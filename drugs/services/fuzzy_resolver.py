@@ -0,0 +1,91 @@
+from collections import defaultdict
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+from drugs.models import Drug, ActiveIngredient
+from drugs.services.catalog import CatalogCache
+
+FRAGMENT_RATIO = 1.5
+
+
+class NameIndex:
+    """
+    Normalized Drug and ActiveIngredient names for fuzzy matching.
+
+    Names are grouped by first character and a query is only scored against
+    its own group: a typo rarely changes the first letter, and it keeps a
+    lookup in the low milliseconds however large the catalog grows.
+    """
+
+    def __init__(self, drug_names, ingredient_names):
+        self.kinds = {}
+        for name in ingredient_names:
+            self.kinds[name.strip().lower()] = "active_ingredient"
+        for name in drug_names:
+            self.kinds[name.strip().lower()] = "drug"
+        self.kinds.pop("", None)
+
+        self.blocks = defaultdict(list)
+        for name in sorted(self.kinds):
+            self.blocks[name[0]].append(name)
+        self.lengths = {char: np.array([len(name) for name in names]) for char, names in self.blocks.items()}
+
+    def _match(self, name, score):
+        return {"name": name, "kind": self.kinds[name], "score": round(float(score), 1)}
+
+    def match(self, query: str, limit: int = 5, cutoff: float = 0) -> list[dict]:
+        """
+        Best catalog names for one query, best first:
+        [{"name": ..., "kind": "drug" | "active_ingredient", "score": 0-100}].
+        """
+        key = query.strip().lower()
+        if not key:
+            return []
+
+        results = process.extract(
+            key, self.blocks.get(key[0], []),
+            scorer=fuzz.WRatio, processor=None, limit=limit, score_cutoff=cutoff
+        )
+        return [self._match(name, score) for name, score, _ in results]
+
+    def best_matches(self, queries: list[str], cutoff: float) -> dict[str, dict | None]:
+        """
+        Best catalog name for many queries at once: one score matrix per
+        first-character group, its rows computed on all cores.
+        Names much longer than the query are skipped: WRatio scores a
+        fragment ("amox") highly against any name containing it, which is
+        fine for suggestions but not for resolving a medication.
+        Returns {query: match or None}.
+        """
+        keys = {query: query.strip().lower() for query in queries}
+
+        groups = defaultdict(list)
+        for key in set(keys.values()):
+            if key and key[0] in self.blocks:
+                groups[key[0]].append(key)
+
+        best = {}
+        for char, group in groups.items():
+            choices = self.blocks[char]
+            scores = process.cdist(
+                group, choices,
+                scorer=fuzz.WRatio, processor=None, score_cutoff=cutoff, workers=-1
+            )
+            for row, key in enumerate(group):
+                scores[row][self.lengths[char] > FRAGMENT_RATIO * len(key)] = 0
+                col = int(scores[row].argmax())
+                if scores[row, col] and scores[row, col] >= cutoff:
+                    best[key] = self._match(choices[col], scores[row, col])
+
+        return {query: best.get(key) for query, key in keys.items()}
+
+
+def _build_index() -> NameIndex:
+    return NameIndex(
+        Drug.objects.values_list("name", flat=True).iterator(),
+        ActiveIngredient.objects.values_list("name", flat=True).iterator()
+    )
+
+
+name_index = CatalogCache(_build_index)
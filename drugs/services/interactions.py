@@ -0,0 +1,199 @@
+from django.db.models import Q
+
+from drugs.models import Medication, MedicationInteraction
+from drugs.services.ddi_model import predict_ddi_batch, model_version
+from drugs.services.medication_links import medication_smiles
+from drugs.services.smiles_resolver import resolve_smiles_for_medications
+from drugs.utils.ddi import classify_severity
+
+
+def drop_interactions(medication: Medication) -> None:
+    MedicationInteraction.objects.filter(
+        Q(medication_a=medication) | Q(medication_b=medication)
+    ).delete()
+
+
+def update_interaction_graph(medication: Medication) -> list[MedicationInteraction]:
+    """
+    Bring the medication's edges in the user's interaction graph up to date
+    and return them. Only partners without an edge for the current model
+    version are scored; finished medications have no edges.
+    """
+    if medication.is_finished:
+        drop_interactions(medication)
+        return []
+
+    version = model_version()
+    edges = MedicationInteraction.objects.filter(
+        Q(medication_a=medication) | Q(medication_b=medication)
+    )
+    edges.exclude(model_version=version).delete()
+
+    linked = set()
+    for a_id, b_id in edges.values_list("medication_a_id", "medication_b_id"):
+        linked.add(b_id if a_id == medication.id else a_id)
+
+    user_meds = list(Medication.objects.filter(
+        user_id=medication.user_id,
+        is_finished=False
+    ).exclude(id=medication.id).exclude(id__in=linked))
+
+    # stored links; only unlinked medications are resolved (in bulk)
+    had_smiles = {med.id for med in user_meds if med.resolved_smiles}
+    smiles = medication_smiles([medication] + user_meds) if user_meds else {}
+    new_smiles = smiles.get(medication.id)
+
+    if new_smiles:
+        candidates = []
+        pairs = []
+
+        for med in user_meds:
+            existing_smiles = smiles[med.id]
+
+            if not existing_smiles:
+                continue
+
+            med_pairs = [(s1, s2) for s1 in new_smiles for s2 in existing_smiles]
+            candidates.append((med, len(med_pairs)))
+            pairs.extend(med_pairs)
+
+        scores = iter(predict_ddi_batch(pairs))
+
+        new_edges = []
+        for med, pair_count in candidates:
+            max_score = round(max(next(scores) for _ in range(pair_count)), 4)
+            a, b = sorted((medication, med), key=lambda m: m.id)
+            new_edges.append(MedicationInteraction(
+                user_id=medication.user_id,
+                medication_a=a,
+                medication_b=b,
+                score=max_score,
+                severity=classify_severity(max_score),
+                model_version=version
+            ))
+
+        MedicationInteraction.objects.bulk_create(new_edges, ignore_conflicts=True)
+
+    # partners that only resolved now were skipped by every earlier screen,
+    # whether or not this medication resolved; score them against the rest
+    # of the regimen too
+    _score_newly_resolved(user_meds, had_smiles, smiles)
+
+    return list(edges.filter(model_version=version).select_related("medication_a", "medication_b"))
+
+
+def _score_newly_resolved(medications, had_smiles: set[int], smiles: dict[int, list[str]]) -> None:
+    for med in medications:
+        if med.id not in had_smiles and smiles[med.id] and not med.is_finished:
+            update_interaction_graph(med)
+
+
+def rescore_medications(medications) -> None:
+    """
+    Rebuild the edges of medications whose SMILES changed, e.g. relinked
+    after load_drug_herbs or backfill_smiles (pass as
+    relink_medications(on_changed=...)). Pairs skipped earlier for lack
+    of SMILES get scored here.
+    """
+    for medication in medications:
+        drop_interactions(medication)
+        update_interaction_graph(medication)
+
+
+def screen_medication(medication: Medication) -> list[dict]:
+    """
+    Check a newly added medication against the user's other active
+    medications, recording the results in the interaction graph.
+    Returns the interactions at or above 0.7 (the `severity_check` list).
+    """
+    interactions = []
+
+    for edge in update_interaction_graph(medication):
+        if edge.score < 0.7:
+            continue
+
+        other = edge.medication_b if edge.medication_a_id == medication.id else edge.medication_a
+        interactions.append({
+            "with": other.name,
+            "interaction_probability": edge.score,
+            "risk_level": edge.severity
+        })
+
+    return interactions
+
+
+def regimen_matrix(names: list[str]) -> dict:
+    """
+    Score every pair of drugs in a regimen.
+
+    Names are resolved in bulk, and the SMILES pairs of all drug pairs are
+    scored in one batched call (duplicates collapse there). A drug pair's
+    score is the max over its ingredient pairs, as in the single-pair check.
+    """
+    # case-insensitive dedupe, keep the first spelling
+    unique = []
+    seen = set()
+    for name in names:
+        key = name.strip().lower()
+        if key and key not in seen:
+            seen.add(key)
+            unique.append(name.strip())
+
+    return _score_regimen(unique, resolve_smiles_for_medications(unique))
+
+
+def medication_regimen_matrix(medications) -> dict:
+    """
+    regimen_matrix for stored medications: their SMILES come from the
+    catalog links (see medication_links), so names are not resolved again.
+    Medications that resolve here get their interaction graph edges too.
+    """
+    medications = list(medications)
+    had_smiles = {med.id for med in medications if med.resolved_smiles}
+    by_id = medication_smiles(medications)
+    _score_newly_resolved(medications, had_smiles, by_id)
+
+    smiles = {}
+    for med in medications:
+        smiles.setdefault(med.name, by_id[med.id])
+
+    return _score_regimen(list(smiles), smiles)
+
+
+def _score_regimen(names: list[str], smiles: dict[str, list[str]]) -> dict:
+    drugs = [name for name in names if smiles[name]]
+
+    candidates = []
+    pairs = []
+    for i, name_a in enumerate(drugs):
+        for name_b in drugs[i + 1:]:
+            drug_pairs = [(s1, s2) for s1 in smiles[name_a] for s2 in smiles[name_b]]
+            candidates.append((name_a, name_b, len(drug_pairs)))
+            pairs.extend(drug_pairs)
+
+    scores = iter(predict_ddi_batch(pairs))
+
+    index = {name: i for i, name in enumerate(drugs)}
+    matrix = [[None] * len(drugs) for _ in drugs]
+    interactions = []
+
+    for name_a, name_b, pair_count in candidates:
+        score = round(max(next(scores) for _ in range(pair_count)), 4)
+
+        matrix[index[name_a]][index[name_b]] = score
+        matrix[index[name_b]][index[name_a]] = score
+        interactions.append({
+            "drug_a": name_a,
+            "drug_b": name_b,
+            "interaction_probability": score,
+            "risk_level": classify_severity(score)
+        })
+
+    interactions.sort(key=lambda item: item["interaction_probability"], reverse=True)
+
+    return {
+        "drugs": drugs,
+        "unresolved": [name for name in names if not smiles[name]],
+        "matrix": matrix,
+        "interactions": interactions,
+    }
@@ -0,0 +1,102 @@
+from django.conf import settings
+from django.utils import timezone
+
+from drugs.models import Medication
+from drugs.services.active_resolver import resolve_drugs_many
+from drugs.services.fuzzy_resolver import name_index
+from drugs.services.pubchem_cache import lookup_smiles_many
+
+LINK_FIELDS = ["drug", "ingredient_ids", "resolved_smiles", "resolved_at"]
+
+
+def link_medications(medications) -> dict[int, dict]:
+    """
+    Resolve medication names once and store the result on the rows: the
+    matching Drug, its ingredient ids and their SMILES. Names the catalog
+    cannot resolve go to PubChem (through the lookup cache), and names
+    PubChem does not know either (typically misspellings) to the closest
+    catalog name at DRUG_FUZZY_CUTOFF or better.
+    A constant number of queries for any number of medications.
+    Returns {medication id: fuzzy match} for the medications linked by a
+    fuzzy match.
+    """
+    medications = list(medications)
+    if not medications:
+        return {}
+
+    resolved = resolve_drugs_many(list({med.name for med in medications}))
+
+    def has_smiles(name):
+        return any(ai.smiles for ai in resolved[name][1])
+
+    missing = [name for name in resolved if not has_smiles(name)]
+    from_pubchem = lookup_smiles_many(missing) if missing else {}
+
+    unknown = [name for name in missing if not from_pubchem.get(name)]
+    matches = {}
+    if unknown:
+        matches = {
+            name: match
+            for name, match in name_index.get().best_matches(unknown, settings.DRUG_FUZZY_CUTOFF).items()
+            if match
+        }
+        matched = resolve_drugs_many([match["name"] for match in matches.values()])
+        for name, match in matches.items():
+            resolved[name] = matched[match["name"]]
+
+    now = timezone.now()
+    fuzzy = {}
+    for med in medications:
+        drug, ingredients = resolved[med.name]
+        smiles = [ai.smiles for ai in ingredients if ai.smiles]
+        if not smiles and from_pubchem.get(med.name):
+            smiles = [from_pubchem[med.name]]
+        if med.name in matches:
+            fuzzy[med.id] = matches[med.name]
+
+        med.drug = drug
+        med.ingredient_ids = [ai.id for ai in ingredients]
+        med.resolved_smiles = smiles
+        med.resolved_at = now
+
+    Medication.objects.bulk_update(medications, LINK_FIELDS)
+    return fuzzy
+
+
+def medication_smiles(medications) -> dict[int, list[str]]:
+    """
+    SMILES of each medication from its stored link. Only medications never
+    linked, or linked to nothing (retried in case PubChem or the catalog
+    has learned the name since), are resolved again.
+    Returns {medication id: [smiles, ...]}.
+    """
+    link_medications(med for med in medications if med.resolved_at is None or not med.resolved_smiles)
+    return {med.id: med.resolved_smiles for med in medications}
+
+
+def relink_medications(queryset=None, batch_size: int = 500, on_changed=None) -> int:
+    """
+    Resolve the links again, in id-keyset batches, e.g. after the catalog
+    was reloaded. `on_changed` is called with each batch's active
+    medications whose SMILES changed (see interactions.rescore_medications).
+    Returns the number of medications processed.
+    """
+    if queryset is None:
+        queryset = Medication.objects.all()
+
+    count = 0
+    last_id = 0
+    while True:
+        batch = list(queryset.filter(id__gt=last_id).order_by("id")[:batch_size])
+        if not batch:
+            return count
+
+        before = {med.id: med.resolved_smiles for med in batch}
+        link_medications(batch)
+
+        changed = [med for med in batch if not med.is_finished and med.resolved_smiles != before[med.id]]
+        if changed and on_changed:
+            on_changed(changed)
+
+        count += len(batch)
+        last_id = batch[-1].id
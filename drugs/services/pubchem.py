@@ -1,24 +1,365 @@
+import os
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import quote
+
 import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
 
-PUBCHEM_URL = (
-    "https://pubchem.ncbi.nlm.nih.gov/rest/pug/"
-    "compound/name/{name}/property/CanonicalSMILES,ConnectivitySMILES/JSON"
-)
+from drugs.services.pubchem_mirror import get_mirror
 
+PUBCHEM_PATH = "/compound/name/{name}/property/CanonicalSMILES,ConnectivitySMILES/JSON"
 
-def get_smiles_from_pubchem(drug_name: str) -> str | None:
-    try:
-        url = PUBCHEM_URL.format(name=drug_name)
-        response = requests.get(url, timeout=5)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class PubChemUnavailable(Exception):
+    """
+    PubChem could not answer (network error, 5xx, throttling), as opposed
+    to answering that the name is unknown.
+    """
+
+
+class TokenBucket:
+    """
+    Allows `rate` acquisitions per second on average, bursting up to `capacity`.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: float | None = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+
+                wait = (1 - self._tokens) / self.rate
+
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures and rejects calls for
+    `cooldown` seconds; then lets one trial call through (half-open).
+    """
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.cooldown:
+                return "half-open"
+            return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.cooldown or self._trial:
+                return False
+            self._trial = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+            self._trial = False
+
+    def release(self):
+        """
+        Give back a half-open trial that never reached the server.
+        """
+        with self._lock:
+            self._trial = False
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key: the first caller runs the
+    function, the others wait for and share its result (or exception).
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn) -> tuple[object, bool]:
+        """
+        Returns (result, shared); `shared` is True when another caller did the work.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = fn()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class PubChemClient:
+    """
+    PubChem PUG-REST client: keep-alive connection pool, bounded retries
+    with jittered exponential backoff, a shared rate limiter and a circuit
+    breaker. Concurrent lookups of the same name share one request.
+    `counters` records the outcome of every call.
+    """
+
+    def __init__(
+            self,
+            base_url: str,
+            timeout: float = 5,
+            max_retries: int = 2,
+            backoff: float = 0.5,
+            rate_limiter: TokenBucket | None = None,
+            breaker: CircuitBreaker | None = None,
+            pool_size: int = 10
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.rate_limiter = rate_limiter
+        self.breaker = breaker
+        self.pool_size = pool_size
+        self.counters = Counter()
+        self._flight = SingleFlight()
+        self._session = None
+        self._pid = None
 
-        if response.status_code != 200:
-            return None
+    @property
+    def session(self) -> requests.Session:
+        # connections inherited through fork are shared with the parent
+        if self._session is None or self._pid != os.getpid():
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self._session = session
+            self._pid = os.getpid()
+        return self._session
 
-        data = response.json()
-        props = data["PropertyTable"]["Properties"][0]
+    def _sleep_before_retry(self, attempt: int, retry_after: str | None = None):
+        delay = self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, min(float(retry_after), 10.0))
+        time.sleep(delay)
 
-        # Prefer Canonical, fallback to Connectivity
-        return props.get("CanonicalSMILES") or props.get("ConnectivitySMILES")
+    def fetch_smiles(self, drug_name: str) -> str | None:
+        """
+        Returns the SMILES, or None when PubChem does not know the name.
+        Raises PubChemUnavailable when the lookup itself failed.
+        """
+        key = drug_name.strip().lower()
+        smiles, shared = self._flight.do(key, lambda: self._fetch(drug_name))
+        if shared:
+            self.counters["coalesced"] += 1
+        return smiles
 
-    except (KeyError, IndexError, ValueError):
+    def fetch_smiles_many(self, names: list[str], max_workers: int) -> dict[str, str | None]:
+        """
+        Look names up concurrently on a bounded thread pool, so the total
+        latency is that of the slowest lookup; the rate limiter still applies.
+        Returns {name: smiles or None}; names whose lookup failed
+        (PubChemUnavailable) are left out.
+        """
+        names = list(dict.fromkeys(names))
+        if not names:
+            return {}
+
+        def fetch(name):
+            try:
+                return name, self.fetch_smiles(name)
+            except PubChemUnavailable:
+                return name, PubChemUnavailable
+
+        if len(names) == 1:
+            results = [fetch(names[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(names))) as pool:
+                results = list(pool.map(fetch, names))
+
+        return {name: smiles for name, smiles in results if smiles is not PubChemUnavailable}
+
+    def _fetch(self, drug_name: str) -> str | None:
+        if self.breaker and not self.breaker.allow():
+            self.counters["short_circuited"] += 1
+            raise PubChemUnavailable("PubChem circuit is open")
+
+        url = self.base_url + PUBCHEM_PATH.format(name=quote(drug_name, safe=""))
+        error = None
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.counters["retries"] += 1
+
+            if self.rate_limiter and not self.rate_limiter.acquire(timeout=self.timeout):
+                self.counters["rate_limited"] += 1
+                if error is None:
+                    # only our own queue was too slow, which says nothing
+                    # about PubChem: not a breaker failure
+                    if self.breaker:
+                        self.breaker.release()
+                    self.counters["failed"] += 1
+                    raise PubChemUnavailable("Rate limit wait exceeded")
+                break
+
+            try:
+                response = self.session.get(url, timeout=self.timeout)
+            except requests.RequestException as exc:
+                self.counters["network_errors"] += 1
+                error = str(exc)
+                if attempt < self.max_retries:
+                    self._sleep_before_retry(attempt)
+                continue
+
+            if response.status_code == 200:
+                try:
+                    data = response.json()
+                    props = data["PropertyTable"]["Properties"][0]
+                except (KeyError, IndexError, TypeError, ValueError):
+                    # a truncated or unexpected body is a server error, not an unknown name
+                    self.counters["server_errors"] += 1
+                    error = "PubChem returned an unreadable answer"
+                    if attempt < self.max_retries:
+                        self._sleep_before_retry(attempt)
+                    continue
+
+                if self.breaker:
+                    self.breaker.record_success()
+                self.counters["ok"] += 1
+                # Prefer Canonical, fallback to Connectivity
+                return props.get("CanonicalSMILES") or props.get("ConnectivitySMILES")
+
+            if response.status_code in (400, 404):
+                if self.breaker:
+                    self.breaker.record_success()
+                self.counters["not_found"] += 1
+                return None
+
+            self.counters["server_errors"] += 1
+            error = f"PubChem returned {response.status_code}"
+            if response.status_code not in RETRY_STATUSES:
+                break
+            if attempt < self.max_retries:
+                self._sleep_before_retry(attempt, response.headers.get("Retry-After"))
+
+        if self.breaker:
+            self.breaker.record_failure()
+        self.counters["failed"] += 1
+        raise PubChemUnavailable(error)
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "circuit": self.breaker.state if self.breaker else None,
+        }
+
+
+_client = None
+
+
+def get_client() -> PubChemClient:
+    """
+    Process-wide client; every thread shares its pool, rate limiter and breaker.
+    """
+    global _client
+
+    if _client is None:
+        _client = PubChemClient(
+            settings.PUBCHEM_BASE_URL,
+            timeout=settings.PUBCHEM_TIMEOUT,
+            max_retries=settings.PUBCHEM_MAX_RETRIES,
+            rate_limiter=TokenBucket(settings.PUBCHEM_RATE_LIMIT),
+            breaker=CircuitBreaker(
+                settings.PUBCHEM_BREAKER_THRESHOLD,
+                settings.PUBCHEM_BREAKER_COOLDOWN
+            )
+        )
+    return _client
+
+
+def _mirror_answers(names: list[str]) -> dict[str, str | None]:
+    # with PUBCHEM_MIRROR_ONLY a mirror miss is final ("not found")
+    mirror = get_mirror()
+    if mirror is None:
+        return {}
+
+    answers = {}
+    for name in names:
+        smiles = mirror.get(name)
+        if smiles is not None or settings.PUBCHEM_MIRROR_ONLY:
+            answers[name] = smiles
+    return answers
+
+
+def fetch_smiles(drug_name: str) -> str | None:
+    answers = _mirror_answers([drug_name])
+    if drug_name in answers:
+        return answers[drug_name]
+    return get_client().fetch_smiles(drug_name)
+
+
+def fetch_smiles_many(names: list[str]) -> dict[str, str | None]:
+    answers = _mirror_answers(names)
+    answers.update(get_client().fetch_smiles_many(
+        [name for name in names if name not in answers],
+        settings.PUBCHEM_MAX_WORKERS
+    ))
+    return answers
+
+
+def get_smiles_from_pubchem(drug_name: str) -> str | None:
+    try:
+        return fetch_smiles(drug_name)
+    except PubChemUnavailable:
         return None
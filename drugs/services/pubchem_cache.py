@@ -0,0 +1,96 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from drugs.models import ActiveIngredient, PubChemLookup
+from drugs.services.pubchem import fetch_smiles_many
+
+
+def normalize_name(name: str) -> str:
+    return name.strip().lower()
+
+
+def _fresh(entry: PubChemLookup) -> bool:
+    # hits never expire; misses are retried after PUBCHEM_NEGATIVE_TTL
+    if entry.smiles:
+        return True
+    return entry.fetched_at >= timezone.now() - timedelta(seconds=settings.PUBCHEM_NEGATIVE_TTL)
+
+
+def cached_lookups(keys) -> dict[str, str | None]:
+    """
+    Fresh cached answers for normalized names, in one query.
+    Names never looked up, or whose negative answer expired, are left out.
+    """
+    return {
+        entry.name: entry.smiles
+        for entry in PubChemLookup.objects.filter(name__in=set(keys))
+        if _fresh(entry)
+    }
+
+
+def record_lookups(answers: dict[str, str | None]) -> None:
+    """
+    Remember PubChem answers for normalized names, in one upsert.
+    """
+    now = timezone.now()
+    PubChemLookup.objects.bulk_create(
+        [PubChemLookup(name=key, smiles=smiles, fetched_at=now) for key, smiles in answers.items()],
+        update_conflicts=True,
+        unique_fields=["name"],
+        update_fields=["smiles", "fetched_at"]
+    )
+
+
+def write_back_smiles(answers: dict[str, str | None]) -> int:
+    """
+    Copy resolved SMILES to the matching ActiveIngredient rows that have
+    none (matched on Lower("name"), which is indexed), so the DB path finds
+    them next time. Two queries. Returns the number of rows updated.
+    """
+    resolved = {key: smiles for key, smiles in answers.items() if smiles}
+    if not resolved:
+        return 0
+
+    ingredients = list(
+        ActiveIngredient.objects.annotate(name_lower=Lower("name"))
+        .filter(Q(smiles__isnull=True) | Q(smiles=""), name_lower__in=resolved)
+    )
+    for ingredient in ingredients:
+        ingredient.smiles = resolved[ingredient.name_lower]
+
+    ActiveIngredient.objects.bulk_update(ingredients, ["smiles"])
+    return len(ingredients)
+
+
+def lookup_smiles_many(names: list[str]) -> dict[str, str | None]:
+    """
+    Resolve names through the lookup cache (one query), asking PubChem only
+    for names never looked up or whose negative result has expired. Those
+    are fetched concurrently; the DB writes stay in the calling thread.
+    Returns {name: smiles or None}.
+    """
+    keys = {name: normalize_name(name) for name in names}
+    cached = cached_lookups(keys.values())
+
+    fetched = fetch_smiles_many([key for key in dict.fromkeys(keys.values()) if key not in cached])
+    record_lookups(fetched)
+    write_back_smiles(fetched)
+
+    resolved = {}
+    for name, key in keys.items():
+        if key in cached:
+            resolved[name] = cached[key]
+        else:
+            # missing from `fetched` when PubChem was unavailable: not cached,
+            # retried on the next request
+            resolved[name] = fetched.get(key)
+
+    return resolved
+
+
+def lookup_smiles(name: str) -> str | None:
+    return lookup_smiles_many([name])[name]
@@ -0,0 +1,86 @@
+import mmap
+import os
+
+import numpy as np
+from django.conf import settings
+
+from drugs.utils.artifacts import current_version
+
+DATA_FILE = "data.tsv"
+INDEX_FILE = "index.idx"
+
+_mirror = None
+_loaded = False
+_identity = None
+
+
+class PubChemMirror:
+    """
+    Read-only name -> SMILES index built by `manage.py build_pubchem_mirror`.
+
+    The data file holds "name\\tsmiles\\n" lines sorted by name (UTF-8 bytes),
+    the index file the uint64 offset of every line. Both are memory-mapped,
+    so a lookup is a binary search over the page cache and memory stays
+    bounded however many synonyms the dump had.
+    `directory` is one published version, holding both files.
+    """
+
+    def __init__(self, directory: str):
+        with open(os.path.join(directory, DATA_FILE), "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.offsets = np.memmap(os.path.join(directory, INDEX_FILE), dtype=np.uint64, mode="r")
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def _entry(self, i: int) -> tuple[bytes, int, int]:
+        start = int(self.offsets[i])
+        end = self.data.find(b"\n", start)
+        tab = self.data.find(b"\t", start, end)
+        return self.data[start:tab], tab + 1, end
+
+    def get(self, name: str) -> str | None:
+        key = name.strip().lower().encode("utf-8")
+
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._entry(mid)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        if lo == len(self):
+            return None
+
+        found, start, end = self._entry(lo)
+        if found != key:
+            return None
+        return self.data[start:end].decode("utf-8")
+
+
+def get_mirror() -> PubChemMirror | None:
+    """
+    The mirror at PUBCHEM_MIRROR_PATH, reopened when build_pubchem_mirror
+    publishes a new version. None when not configured or not built yet.
+    """
+    global _mirror, _loaded, _identity
+
+    path = settings.PUBCHEM_MIRROR_PATH
+    # every build is a new version directory behind the PUBCHEM_MIRROR_PATH symlink
+    identity = current_version(path) if path else None
+
+    if not _loaded or identity != _identity:
+        _loaded = True
+        _identity = identity
+        _mirror = PubChemMirror(identity) if identity else None
+
+    return _mirror
+
+
+def reset_mirror():
+    global _mirror, _loaded, _identity
+
+    _mirror = None
+    _loaded = False
+    _identity = None
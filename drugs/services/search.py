@@ -0,0 +1,91 @@
+import re
+
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+from django.db.models import F, OuterRef, Q, Subquery, TextField, Value
+from django.db.models.functions import Coalesce, Concat
+
+from drugs.models import Drug, DrugAlternative
+
+SEARCH_CONFIG = "simple"  # drug names are not English words; no stemming or stop words
+
+
+def _related_text(queryset, expression):
+    return Coalesce(
+        Subquery(
+            queryset.filter(drug_id=OuterRef("pk"))
+            .values("drug_id")
+            .annotate(text=StringAgg(expression, " "))
+            .values("text")
+        ),
+        Value(""),
+        output_field=TextField()
+    )
+
+
+def search_document():
+    """
+    The weighted document behind Drug.search_vector: the drug name (A),
+    its active ingredients (B), drug classes and ATC codes of its
+    alternatives (C) and their herbal alternatives (D).
+    """
+    through = Drug.active_ingredients.through
+
+    return (
+        SearchVector("name", weight="A", config=SEARCH_CONFIG)
+        + SearchVector(
+            _related_text(through.objects, "activeingredient__name"),
+            weight="B", config=SEARCH_CONFIG
+        )
+        + SearchVector(
+            _related_text(
+                DrugAlternative.objects,
+                Concat(
+                    Coalesce("drug_class", Value("")), Value(" "), Coalesce("atc_code", Value("")),
+                    output_field=TextField()
+                )
+            ),
+            weight="C", config=SEARCH_CONFIG
+        )
+        + SearchVector(
+            _related_text(DrugAlternative.objects, "herbal_alternatives"),
+            weight="D", config=SEARCH_CONFIG
+        )
+    )
+
+
+def refresh_search_vectors(drug_ids=None) -> int:
+    """
+    Recompute Drug.search_vector in one UPDATE, for the given drugs or all
+    of them (e.g. after load_drug_herbs). Returns the number of rows.
+    """
+    drugs = Drug.objects.all()
+    if drug_ids is not None:
+        drugs = drugs.filter(id__in=drug_ids)
+    return drugs.update(search_vector=search_document())
+
+
+def search_drugs(text: str):
+    """
+    Drugs matching `text`, most relevant first. Every word is matched as a
+    prefix against the search vector (GIN index); drug names also match by
+    trigram similarity (GIN trigram index), which catches misspellings.
+    """
+    words = re.findall(r"\w+", text.lower())
+    if not words:
+        return Drug.objects.none()
+
+    query = SearchQuery(
+        " & ".join(f"{word}:*" for word in words),
+        search_type="raw", config=SEARCH_CONFIG
+    )
+    name = " ".join(words)
+
+    return (
+        Drug.objects.filter(Q(search_vector=query) | Q(name__trigram_similar=name))
+        .annotate(
+            rank=SearchRank(F("search_vector"), query),
+            similarity=TrigramSimilarity("name", name)
+        )
+        .order_by("-rank", "-similarity", "name")
+    )
@@ -0,0 +1,98 @@
+import numpy as np
+
+
+def _gather(ptr: np.ndarray, values: np.ndarray, keys: np.ndarray):
+    """
+    Concatenated slices values[ptr[key]:ptr[key + 1]] of a CSR layout for
+    every key, vectorized. Returns (position of the key, value) arrays.
+    """
+    counts = ptr[keys + 1] - ptr[keys]
+    firsts = np.repeat(ptr[keys], counts)
+    steps = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return np.repeat(np.arange(len(keys)), counts), values[firsts + steps]
+
+
+class Incidence:
+    """
+    Sparse drug x ingredient incidence matrix, kept both row-wise (CSR:
+    the ingredients of each drug) and column-wise (the drugs of each
+    ingredient), built from (drug_id, ingredient_id) pairs with NumPy only.
+    Rows and columns are positions in `drug_ids` / `ingredient_ids`.
+    """
+
+    def __init__(self, pairs):
+        pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+
+        self.drug_ids, rows = np.unique(pairs[:, 0], return_inverse=True)
+        self.ingredient_ids, cols = np.unique(pairs[:, 1], return_inverse=True)
+        n, m = len(self.drug_ids), len(self.ingredient_ids)
+
+        order = np.lexsort((cols, rows))
+        self.row_ptr = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=n))))
+        self.row_cols = cols[order]
+
+        order = np.lexsort((rows, cols))
+        self.col_ptr = np.concatenate(([0], np.cumsum(np.bincount(cols, minlength=m))))
+        self.col_rows = rows[order]
+
+        self.sizes = np.diff(self.row_ptr)
+
+    def __len__(self):
+        return len(self.drug_ids)
+
+    def row_work(self) -> np.ndarray:
+        """
+        Candidate pairs each row expands to (the sum of its ingredients'
+        drug counts): the memory a block of rows needs is proportional to it.
+        """
+        per_entry = np.diff(self.col_ptr)[self.row_cols]
+        return np.add.reduceat(per_entry, self.row_ptr[:-1]) if len(per_entry) else per_entry
+
+    def blocks(self, rows: np.ndarray, max_pairs: int) -> list[np.ndarray]:
+        """
+        Split `rows` into blocks of about `max_pairs` candidate pairs each;
+        a row above the limit gets a block of its own.
+        """
+        work = self.row_work()[rows]
+        blocks = []
+        start = 0
+        total = 0
+        for i, count in enumerate(work):
+            if i > start and total + count > max_pairs:
+                blocks.append(rows[start:i])
+                start, total = i, 0
+            total += count
+        if start < len(rows):
+            blocks.append(rows[start:])
+        return blocks
+
+    def top_k(self, block: np.ndarray, k: int, min_score: float = 0.0):
+        """
+        Top-k Jaccard-similar rows for every row of `block`, without the row
+        itself. Intersections are counted by expanding every (row, ingredient)
+        entry of the block to the ingredient's drugs, so only pairs sharing
+        at least one ingredient are ever materialized.
+        Returns (rows, others, scores) arrays, by row then descending score.
+        """
+        at, cols = _gather(self.row_ptr, self.row_cols, block)
+        rows = block[at]
+
+        # every drug sharing each entry's ingredient
+        at, others = _gather(self.col_ptr, self.col_rows, cols)
+        rows = rows[at]
+
+        keep = others != rows
+        keys, inter = np.unique(rows[keep] * len(self) + others[keep], return_counts=True)
+        rows, others = np.divmod(keys, len(self))
+
+        scores = inter / (self.sizes[rows] + self.sizes[others] - inter)
+        keep = scores >= min_score
+        rows, others, scores = rows[keep], others[keep], scores[keep]
+
+        # rank within each row: descending score, ties by position
+        order = np.lexsort((others, -scores, rows))
+        rows, others, scores = rows[order], others[order], scores[order]
+        firsts = np.searchsorted(rows, rows, side="left")
+        keep = np.arange(len(rows)) - firsts < k
+
+        return rows[keep], others[keep], scores[keep]
@@ -1,12 +1,12 @@
-from drugs.services.active_resolver import resolve_active_ingredients
-from drugs.services.pubchem import get_smiles_from_pubchem
+from drugs.services.active_resolver import resolve_active_ingredients, resolve_active_ingredients_many
+from drugs.services.pubchem_cache import lookup_smiles, lookup_smiles_many
 
 
 def resolve_smiles_for_medication(med_name: str) -> list[str]:
     """
     Resolve SMILES for a medication name:
     1) ActiveIngredients in DB
-    2) PubChem fallback
+    2) PubChem fallback (through the lookup cache)
     """
     smiles_list = []
 
@@ -18,8 +18,31 @@ def resolve_smiles_for_medication(med_name: str) -> list[str]:
 
     # PubChem fallback
     if not smiles_list:
-        smiles = get_smiles_from_pubchem(med_name)
+        smiles = lookup_smiles(med_name)
         if smiles:
             smiles_list.append(smiles)
 
     return smiles_list
+
+
+def resolve_smiles_for_medications(names: list[str]) -> dict[str, list[str]]:
+    """
+    Bulk version of resolve_smiles_for_medication for a whole regimen:
+    a constant number of queries for all names (see
+    resolve_active_ingredients_many), then one lookup-cache query, and
+    PubChem only for names nothing else resolves.
+    Returns {name: [smiles, ...]}.
+    """
+    resolved = {
+        name: [ai.smiles for ai in ingredients if ai.smiles]
+        for name, ingredients in resolve_active_ingredients_many(names).items()
+    }
+
+    # PubChem fallback (through the lookup cache)
+    missing = [name for name, smiles_list in resolved.items() if not smiles_list]
+    if missing:
+        for name, smiles in lookup_smiles_many(missing).items():
+            if smiles:
+                resolved[name] = [smiles]
+
+    return resolved
@@ -0,0 +1,84 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import ActiveIngredient, Drug, DrugAlternative, Herb
+from .services.drug_details import refresh_drug_details
+from .services.equivalents import refresh_ingredient_signatures
+
+# bulk_create on the through tables (load_drug_herbs) and the bulk writes
+# of compute_alternatives send no signal; both refresh the details themselves
+
+
+def _changed_drug_ids(instance, action, drug_side, pk_set):
+    """
+    Drugs affected by an m2m change. From the drug side that is the instance;
+    from the other side pk_set holds drug ids, except on clear, where the
+    drugs have to be collected before the links go (None until post_clear).
+    """
+    if drug_side:
+        return [instance.pk]
+    if action == "pre_clear":
+        instance._cleared_drug_ids = list(instance.drugs.values_list("id", flat=True))
+        return None
+    if action == "post_clear":
+        return instance.__dict__.pop("_cleared_drug_ids", [])
+    return pk_set
+
+
+def _refresh_details_on_commit(drug_ids):
+    # after commit: a rolled-back transaction leaves no refreshed document
+    # behind, and inside a cascading Drug delete the upsert would recreate
+    # the detail row of a drug that is about to go
+    drug_ids = list(drug_ids)
+    transaction.on_commit(lambda: refresh_drug_details(drug_ids))
+
+
+def _name_saved(kwargs) -> bool:
+    update_fields = kwargs.get("update_fields")
+    return update_fields is None or "name" in update_fields
+
+
+@receiver(m2m_changed, sender=Drug.active_ingredients.through)
+def update_ingredient_signature(sender, instance, action, reverse, pk_set, **kwargs):
+    drug_ids = _changed_drug_ids(instance, action, not reverse, pk_set)
+    if action in ("post_add", "post_remove", "post_clear"):
+        refresh_ingredient_signatures(drug_ids)
+        _refresh_details_on_commit(drug_ids)
+
+
+@receiver(m2m_changed, sender=Herb.drugs.through)
+def update_herb_drug_details(sender, instance, action, reverse, pk_set, **kwargs):
+    drug_ids = _changed_drug_ids(instance, action, reverse, pk_set)
+    if action in ("post_add", "post_remove", "post_clear"):
+        _refresh_details_on_commit(drug_ids)
+
+
+@receiver(post_save, sender=Drug)
+def update_drug_details(sender, instance, **kwargs):
+    _refresh_details_on_commit([instance.pk])
+
+
+@receiver(post_save, sender=DrugAlternative)
+@receiver(post_delete, sender=DrugAlternative)
+def update_alternative_drug_details(sender, instance, **kwargs):
+    _refresh_details_on_commit([instance.drug_id])
+
+
+# the documents embed ingredient and herb names; a delete removes the links
+# without m2m_changed, so the drugs are collected before it
+@receiver(post_save, sender=ActiveIngredient)
+@receiver(pre_delete, sender=ActiveIngredient)
+def update_ingredient_drug_details(sender, instance, **kwargs):
+    if _name_saved(kwargs):
+        _refresh_details_on_commit(
+            Drug.active_ingredients.through.objects.filter(activeingredient_id=instance.pk)
+            .values_list("drug_id", flat=True)
+        )
+
+
+@receiver(post_save, sender=Herb)
+@receiver(pre_delete, sender=Herb)
+def update_herb_details(sender, instance, **kwargs):
+    if _name_saved(kwargs):
+        _refresh_details_on_commit(instance.drugs.values_list("id", flat=True))
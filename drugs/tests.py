@@ -1,3 +1,373 @@
-from django.test import TestCase
+import datetime
+import json
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from functools import partial
+from unittest import mock
+from urllib.parse import unquote
 
-# Create your tests here.
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TestCase, override_settings
+from tqdm import tqdm
+
+from authentication.models import User
+from drugs.models import ActiveIngredient, Drug, Medication, MedicationInteraction
+from drugs.services import pubchem
+from drugs.services.interactions import medication_regimen_matrix, screen_medication
+from drugs.services.medication_links import link_medications
+from drugs.services.pubchem import CircuitBreaker, PubChemClient, PubChemUnavailable, TokenBucket
+
+
+class StubPubChem(ThreadingHTTPServer):
+    """
+    Local PubChem stand-in. Answers names in `smiles` with their SMILES and
+    anything else with a 404; statuses, or (status, body) tuples, queued in
+    `script` are returned first, one per request. `delay` slows every
+    answer down.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, smiles=None):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.smiles = smiles or {}
+        self.script = []
+        self.delay = 0
+        self.hits = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        with server._lock:
+            server.hits += 1
+            status = server.script.pop(0) if server.script else None
+        time.sleep(server.delay)
+
+        # /compound/name/<name>/property/...
+        name = unquote(self.path.split("/")[3])
+        if status is None:
+            status = 200 if name in server.smiles else 404
+
+        body = b""
+        if isinstance(status, tuple):
+            status, body = status
+        elif status == 200:
+            body = json.dumps(
+                {"PropertyTable": {"Properties": [{"CanonicalSMILES": server.smiles[name]}]}}
+            ).encode()
+
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class PubChemClientTests(SimpleTestCase):
+    def client_for(self, server, **kwargs):
+        return PubChemClient(server.url, timeout=2, backoff=0, **kwargs)
+
+    def test_retries_on_503(self):
+        with StubPubChem({"ethanol": "CCO"}) as server:
+            server.script = [503, 503]
+            client = self.client_for(server, max_retries=2)
+
+            self.assertEqual(client.fetch_smiles("ethanol"), "CCO")
+            self.assertEqual(server.hits, 3)
+            self.assertEqual(client.counters["retries"], 2)
+
+    def test_gives_up_after_max_retries(self):
+        with StubPubChem({"ethanol": "CCO"}) as server:
+            server.script = [503, 503, 503]
+            client = self.client_for(server, max_retries=2)
+
+            with self.assertRaises(PubChemUnavailable):
+                client.fetch_smiles("ethanol")
+            self.assertEqual(server.hits, 3)
+
+    def test_not_found_on_404(self):
+        with StubPubChem() as server:
+            client = self.client_for(server)
+
+            self.assertIsNone(client.fetch_smiles("unobtainium"))
+            self.assertEqual(server.hits, 1)
+            self.assertEqual(client.counters["not_found"], 1)
+
+    def test_rate_limiter_spaces_requests(self):
+        with StubPubChem({"ethanol": "CCO"}) as server:
+            client = self.client_for(server, rate_limiter=TokenBucket(rate=20, capacity=1))
+
+            started = time.monotonic()
+            for _ in range(5):
+                client.fetch_smiles("ethanol")
+
+            # one burst token, then one request per 1/20 s
+            self.assertGreaterEqual(time.monotonic() - started, 0.19)
+
+    def test_rate_limiter_timeout_is_not_a_breaker_failure(self):
+        with StubPubChem({"ethanol": "CCO", "benzene": "c1ccccc1"}) as server:
+            client = PubChemClient(
+                server.url, timeout=0.1, backoff=0,
+                rate_limiter=TokenBucket(rate=1, capacity=1),
+                breaker=CircuitBreaker(threshold=1, cooldown=60)
+            )
+
+            self.assertEqual(client.fetch_smiles("ethanol"), "CCO")
+            with self.assertRaises(PubChemUnavailable):
+                client.fetch_smiles("benzene")
+
+            self.assertEqual(server.hits, 1)
+            self.assertEqual(client.breaker.state, "closed")
+            self.assertEqual(client.counters["rate_limited"], 1)
+
+    def test_unreadable_answer_is_a_server_error(self):
+        with StubPubChem({"ethanol": "CCO"}) as server:
+            server.script = [(200, b"{not json")]
+            client = self.client_for(server, max_retries=1)
+
+            self.assertEqual(client.fetch_smiles("ethanol"), "CCO")
+            self.assertEqual(client.counters["server_errors"], 1)
+            self.assertEqual(client.counters["not_found"], 0)
+
+            server.script = [(200, b"{not json")]
+            client = self.client_for(server, max_retries=0)
+            with self.assertRaises(PubChemUnavailable):
+                client.fetch_smiles("ethanol")
+
+    def test_rate_limiter_wait_is_bounded(self):
+        bucket = TokenBucket(rate=1, capacity=1)
+
+        self.assertTrue(bucket.acquire(timeout=0))
+        self.assertFalse(bucket.acquire(timeout=0.1))
+
+    def test_breaker_opens_and_short_circuits(self):
+        with StubPubChem({"ethanol": "CCO"}) as server:
+            server.script = [500, 500]
+            client = self.client_for(server, max_retries=0, breaker=CircuitBreaker(threshold=2, cooldown=60))
+
+            for _ in range(2):
+                with self.assertRaises(PubChemUnavailable):
+                    client.fetch_smiles("ethanol")
+            self.assertEqual(client.breaker.state, "open")
+
+            with self.assertRaises(PubChemUnavailable):
+                client.fetch_smiles("ethanol")
+            self.assertEqual(server.hits, 2)
+            self.assertEqual(client.counters["short_circuited"], 1)
+
+    def test_breaker_half_open_trial(self):
+        with StubPubChem({"ethanol": "CCO"}) as server:
+            server.script = [500, 500]
+            breaker = CircuitBreaker(threshold=1, cooldown=0.1)
+            client = self.client_for(server, max_retries=0, breaker=breaker)
+
+            with self.assertRaises(PubChemUnavailable):
+                client.fetch_smiles("ethanol")
+            time.sleep(0.15)
+            self.assertEqual(breaker.state, "half-open")
+
+            # a failed trial opens the circuit again at once
+            with self.assertRaises(PubChemUnavailable):
+                client.fetch_smiles("ethanol")
+            self.assertEqual(breaker.state, "open")
+
+            time.sleep(0.15)
+            self.assertEqual(client.fetch_smiles("ethanol"), "CCO")
+            self.assertEqual(breaker.state, "closed")
+
+    def test_half_open_lets_one_trial_through(self):
+        breaker = CircuitBreaker(threshold=1, cooldown=0)
+        breaker.record_failure()
+
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+
+    def test_concurrent_lookups_share_one_request(self):
+        with StubPubChem({"ethanol": "CCO"}) as server:
+            server.delay = 0.2
+            client = self.client_for(server)
+            results = []
+
+            threads = [
+                threading.Thread(target=lambda: results.append(client.fetch_smiles("ethanol")))
+                for _ in range(8)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            self.assertEqual(results, ["CCO"] * 8)
+            self.assertEqual(server.hits, 1)
+            self.assertEqual(client.counters["coalesced"], 7)
+
+    def test_fetch_many_leaves_out_unavailable_names(self):
+        with StubPubChem({"ethanol": "CCO", "benzene": "c1ccccc1"}) as server:
+            server.script = [503]
+            client = self.client_for(server, max_retries=0)
+
+            result = client.fetch_smiles_many(["ethanol", "benzene", "unobtainium"], max_workers=1)
+
+            self.assertEqual(result, {"benzene": "c1ccccc1", "unobtainium": None})
+
+
+@override_settings(
+    PUBCHEM_RATE_LIMIT=1000,
+    PUBCHEM_MAX_RETRIES=0,
+    PUBCHEM_BREAKER_THRESHOLD=2,
+    PUBCHEM_BREAKER_COOLDOWN=60,
+    PUBCHEM_MIRROR_PATH=""
+)
+class BackfillSmilesTests(TestCase):
+    def setUp(self):
+        self.server = StubPubChem({"ethanol": "CCO", "benzene": "c1ccccc1", "caffeine": "CN1C=NC2=C1C(=O)N(C)C(=O)N2C"})
+        self.server.__enter__()
+        self.addCleanup(self.server.__exit__)
+
+        # the process-wide client is built from the settings on first use
+        pubchem._client = None
+        self.addCleanup(setattr, pubchem, "_client", None)
+
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.checkpoint = os.path.join(tmpdir.name, "checkpoint.json")
+
+        self.ingredients = [
+            ActiveIngredient.objects.create(name=name)
+            for name in ("ethanol", "benzene", "caffeine", "unobtainium")
+        ]
+
+    def backfill(self, *args):
+        with self.settings(PUBCHEM_BASE_URL=self.server.url), \
+                mock.patch("drugs.management.commands.backfill_smiles.tqdm", partial(tqdm, disable=True)):
+            call_command(
+                "backfill_smiles", "--batch-size", "1", "--checkpoint", self.checkpoint, *args,
+                stdout=StringIO(), stderr=StringIO()
+            )
+
+    def smiles(self):
+        return dict(ActiveIngredient.objects.values_list("name", "smiles"))
+
+    def read_checkpoint(self):
+        with open(self.checkpoint) as f:
+            return json.load(f)
+
+    def test_backfills_and_removes_checkpoint(self):
+        self.backfill()
+
+        self.assertEqual(self.smiles()["ethanol"], "CCO")
+        self.assertIsNone(self.smiles()["unobtainium"])
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_resumes_after_checkpoint(self):
+        with open(self.checkpoint, "w") as f:
+            json.dump({"last_id": self.ingredients[1].id, "failed": []}, f)
+
+        self.backfill()
+
+        smiles = self.smiles()
+        self.assertIsNone(smiles["ethanol"])
+        self.assertIsNone(smiles["benzene"])
+        self.assertEqual(smiles["caffeine"], "CN1C=NC2=C1C(=O)N(C)C(=O)N2C")
+        self.assertEqual(self.server.hits, 2)
+
+    def test_retry_failed(self):
+        self.server.script = [503]
+        self.backfill()
+
+        self.assertIsNone(self.smiles()["ethanol"])
+        self.assertEqual(self.read_checkpoint()["failed"], [self.ingredients[0].id])
+
+        hits = self.server.hits
+        self.backfill("--retry-failed")
+
+        self.assertEqual(self.smiles()["ethanol"], "CCO")
+        self.assertEqual(self.server.hits, hits + 1)
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_stops_when_circuit_opens(self):
+        self.server.script = [500] * 10
+
+        with self.assertRaises(CommandError):
+            self.backfill()
+
+        # two failures open the breaker; the checkpoint holds both
+        state = self.read_checkpoint()
+        self.assertEqual(state["last_id"], self.ingredients[1].id)
+        self.assertEqual(state["failed"], [self.ingredients[0].id, self.ingredients[1].id])
+        self.assertEqual(self.server.hits, 2)
+
+@override_settings(PUBCHEM_RATE_LIMIT=1000, PUBCHEM_MAX_RETRIES=0, PUBCHEM_MIRROR_PATH="")
+class InteractionGraphTests(TestCase):
+    def setUp(self):
+        # PubChem knows none of the names
+        self.server = StubPubChem()
+        self.server.__enter__()
+        self.addCleanup(self.server.__exit__)
+        pubchem._client = None
+        self.addCleanup(setattr, pubchem, "_client", None)
+
+        patcher = mock.patch("drugs.services.interactions.predict_ddi_batch", lambda pairs: [0.9] * len(pairs))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user = User.objects.create_user(
+            username="p@x.com", email="p@x.com", password="x", full_name="P", role="patient"
+        )
+        self.add_drug("panadol", "ethanol", "CCO")
+        self.panadol = self.add_medication("panadol")
+        # linked while the catalog did not know it yet
+        self.late = self.add_medication("novadol")
+        self.add_drug("novadol", "benzene", "c1ccccc1")
+
+    def add_drug(self, name, ingredient, smiles):
+        drug = Drug.objects.create(name=name)
+        drug.active_ingredients.add(ActiveIngredient.objects.create(name=ingredient, smiles=smiles))
+
+    def add_medication(self, name):
+        medication = Medication.objects.create(user=self.user, name=name, dosage="1", time=datetime.time(8))
+        with self.settings(PUBCHEM_BASE_URL=self.server.url):
+            link_medications([medication])
+        return medication
+
+    def edge_exists(self):
+        return MedicationInteraction.objects.filter(medication_a=self.panadol, medication_b=self.late).exists()
+
+    def test_unresolvable_screen_scores_late_resolving_partner(self):
+        self.assertEqual(self.late.resolved_smiles, [])
+        unknown = self.add_medication("unobtainium")
+
+        with self.settings(PUBCHEM_BASE_URL=self.server.url):
+            self.assertEqual(screen_medication(unknown), [])
+
+        self.late.refresh_from_db()
+        self.assertEqual(self.late.resolved_smiles, ["c1ccccc1"])
+        self.assertTrue(self.edge_exists())
+
+    def test_regimen_matrix_scores_late_resolving_partner(self):
+        with self.settings(PUBCHEM_BASE_URL=self.server.url):
+            result = medication_regimen_matrix([self.panadol, self.late])
+
+        self.assertEqual(result["drugs"], ["panadol", "novadol"])
+        self.assertTrue(self.edge_exists())
@@ -1,7 +1,8 @@
 from django.urls import path
 from .views import (
     MedicationListCreateView, MedicationDetailView, DDIPredictView, DrugAlternativesView, HerbalAlternativesView,
-    MarkAsTakenView
+    MarkAsTakenView, RegimenInteractionsView, ScreeningJobView, InteractionGraphView,
+    DrugAutocompleteView, DrugSearchView, HerbDrugsView, DrugEquivalentsView, DrugCatalogDetailView
 )
 
 app_name = "drugs"
@@ -12,6 +13,14 @@ urlpatterns = [
     path('<int:id>/', MedicationDetailView.as_view(), name='medications-detail'),
     path('<int:id>/mark-as-taken/', MarkAsTakenView.as_view(), name='take-medication-dose'),
     path('alternatives/', DrugAlternativesView.as_view(), name='drug-alternatives'),
+    path('alternatives/equivalents', DrugEquivalentsView.as_view(), name='drug-equivalents'),
     path('alternatives/herbs', HerbalAlternativesView.as_view(), name='herbal-alternatives'),
+    path('alternatives/herbs/drugs', HerbDrugsView.as_view(), name='herb-drugs'),
+    path('catalog/<int:id>/', DrugCatalogDetailView.as_view(), name='drug-catalog-detail'),
+    path('search/', DrugSearchView.as_view(), name='drug-search'),
+    path('search/autocomplete', DrugAutocompleteView.as_view(), name='drug-autocomplete'),
     path('predict/', DDIPredictView.as_view(), name='ddi-predict'),
+    path('interactions/', RegimenInteractionsView.as_view(), name='regimen-interactions'),
+    path('interactions/graph/', InteractionGraphView.as_view(), name='interaction-graph'),
+    path('screenings/<uuid:id>/', ScreeningJobView.as_view(), name='screening-job'),
 ]
@@ -0,0 +1,43 @@
+import glob
+import os
+import shutil
+import time
+
+
+def current_version(path: str) -> str | None:
+    """
+    The version directory the symlink at `path` points to, or None when
+    nothing has been published there yet. Readers open every file of an
+    artifact from this one resolved directory, so they never mix the files
+    of two builds.
+    """
+    try:
+        return os.path.realpath(path, strict=True)
+    except OSError:
+        return None
+
+
+def publish_version(build_dir: str, path: str) -> str:
+    """
+    Publish a finished build directory as a new version behind the symlink
+    at `path`: the swap is a single os.replace, so readers see either the
+    whole previous version or the whole new one.
+    The version before the previous one is removed; the previous one stays
+    for readers that resolved the link just before the swap.
+    """
+    previous = current_version(path)
+
+    version_dir = f"{path}.{time.time_ns()}"
+    os.rename(build_dir, version_dir)
+
+    link = path + ".link"
+    if os.path.lexists(link):
+        os.remove(link)
+    os.symlink(os.path.basename(version_dir), link)
+    os.replace(link, path)
+
+    for old in glob.glob(glob.escape(path) + ".[0-9]*"):
+        if os.path.isdir(old) and os.path.realpath(old) not in (version_dir, previous):
+            shutil.rmtree(old, ignore_errors=True)
+
+    return version_dir
@@ -15,3 +15,20 @@ def parse_active_ingredients(raw: str) -> list[str]:
 
     parts = text.split("+")
     return [p.strip() for p in parts if p.strip()]
+
+
+def parse_herbs(raw: str) -> list[str]:
+    """
+    Ginger, Willow  bark, turmeric, ginger
+    -> ["Ginger", "Willow bark", "turmeric"]
+    Duplicates are found case-insensitively; the first spelling is kept.
+    """
+    if not raw:
+        return []
+
+    names = {}
+    for part in raw.split(","):
+        name = " ".join(part.split())
+        if name:
+            names.setdefault(name.lower(), name)
+    return list(names.values())
@@ -1,23 +1,47 @@
 from datetime import timedelta
 
-from drf_spectacular.utils import extend_schema
+from drf_spectacular.utils import OpenApiParameter, extend_schema
 from rest_framework import generics, permissions, status
+from rest_framework.exceptions import ValidationError
 from rest_framework.generics import GenericAPIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from django.conf import settings
+from django.db.models import F
+from django.db.models.functions import Lower
 from django.utils import timezone
 
-from .models import Medication, Drug, DrugAlternative, ActiveIngredient
+from authentication.models import Patient
+from .models import Medication, Drug, DrugAlternative, ActiveIngredient, ScreeningJob, MedicationInteraction, Herb
 from .serializers import (
     MedicationSerializer,
     DrugAlternativeSerializer,
-    DDIPredictSerializer
+    DDIPredictSerializer,
+    RegimenInteractionsSerializer,
+    ScreeningJobSerializer,
+    AutocompleteQuerySerializer,
+    DrugSearchSerializer
 )
+from .pagination import SearchPagination
 
-from drugs.services.ddi_model import predict_ddi
+from drugs.services.ddi_client import DDIServerError
+from drugs.services.ddi_model import predict_ddi_batch
 from drugs.utils.ddi import classify_severity
-from drugs.services.pubchem import get_smiles_from_pubchem
-from .services.smiles_resolver import resolve_smiles_for_medication
+from drugs.services.pubchem_cache import lookup_smiles
+from drugs.services.medication_links import link_medications
+from drugs.services.fuzzy_resolver import name_index
+from drugs.services.autocomplete import prefix_index
+from drugs.services.search import search_drugs
+from drugs.services.equivalents import equivalent_drugs
+from drugs.services.drug_details import drug_detail
+from drugs.services.active_resolver import resolve_active_ingredients
+from .services.interactions import (
+    regimen_matrix,
+    medication_regimen_matrix,
+    screen_medication,
+    drop_interactions,
+    update_interaction_graph
+)
 
 
 # =========================
@@ -50,56 +74,62 @@ class MedicationListCreateView(generics.ListCreateAPIView):
 
         medication = serializer.save(user=request.user)
 
-        user_meds = Medication.objects.filter(
-            user=request.user
-        ).exclude(id=medication.id)
-
-        interactions = []
-
         # =========================
-        # Resolve NEW medication SMILES
+        # Async: link and screen in the background worker
         # =========================
-        new_smiles = resolve_smiles_for_medication(medication.name)
-
-        if not new_smiles:
+        if self.use_async_screening(request):
             headers = self.get_success_headers(serializer.data)
+            job = ScreeningJob.objects.create(user=request.user, medication=medication)
             return Response(
-                {**serializer.data, "severity_check": []},
+                {
+                    **serializer.data,
+                    "name_match": None,
+                    "severity_check": None,
+                    "screening_job": ScreeningJobSerializer(job).data
+                },
                 status=status.HTTP_201_CREATED,
                 headers=headers
             )
 
         # =========================
-        # Check interactions
+        # Link to the catalog, then check interactions
         # =========================
-        for med in user_meds:
-            existing_smiles = resolve_smiles_for_medication(med.name)
-
-            if not existing_smiles:
-                continue
-
-            max_score = 0.0
-
-            for s1 in new_smiles:
-                for s2 in existing_smiles:
-                    score = predict_ddi(s1, s2)
-                    max_score = max(max_score, score)
-
-            if max_score >= 0.7:
-                interactions.append({
-                    "with": med.name,
-                    "interaction_probability": round(max_score, 4),
-                    "risk_level": classify_severity(max_score)
-                })
-
+        fuzzy = link_medications([medication])
         headers = self.get_success_headers(serializer.data)
 
+        try:
+            severity_check = screen_medication(medication)
+        except DDIServerError:
+            # the medication is saved already: queue the screen for the
+            # worker rather than fail a request the client can't retry
+            job = ScreeningJob.objects.create(user=request.user, medication=medication)
+            return Response(
+                {
+                    **serializer.data,
+                    "name_match": fuzzy.get(medication.id),
+                    "severity_check": None,
+                    "screening_job": ScreeningJobSerializer(job).data
+                },
+                status=status.HTTP_201_CREATED,
+                headers=headers
+            )
+
         return Response(
-            {**serializer.data, "severity_check": interactions},
+            {
+                **serializer.data,
+                "name_match": fuzzy.get(medication.id),
+                "severity_check": severity_check
+            },
             status=status.HTTP_201_CREATED,
             headers=headers
         )
 
+    def use_async_screening(self, request):
+        value = request.query_params.get("async")
+        if value is None:
+            return settings.DDI_ASYNC_SCREENING
+        return value.lower() in ("1", "true", "yes")
+
 
 # =========================
 # Medication Detail
@@ -113,6 +143,20 @@ class MedicationDetailView(generics.RetrieveUpdateDestroyAPIView):
     def get_queryset(self):
         return Medication.objects.filter(user=self.request.user)
 
+    def perform_update(self, serializer):
+        previous = (serializer.instance.name, serializer.instance.is_finished)
+        medication = serializer.save()
+
+        if medication.name != previous[0]:
+            link_medications([medication])
+
+        # keep the interaction graph in step with the regimen
+        if medication.is_finished:
+            drop_interactions(medication)
+        elif previous != (medication.name, medication.is_finished):
+            drop_interactions(medication)
+            update_interaction_graph(medication)
+
 
 # =========================
 # Drug Alternatives
@@ -135,7 +179,75 @@ class DrugAlternativesView(generics.ListAPIView):
         if not drug:
             return DrugAlternative.objects.none()
 
-        return DrugAlternative.objects.filter(drug=drug)
+        # CSV alternatives without a score come after the scored ones
+        return (
+            DrugAlternative.objects.filter(drug=drug)
+            .select_related("drug")
+            .prefetch_related("drug__active_ingredients")
+            .order_by(F("match_score").desc(nulls_last=True), "substitute")
+        )
+
+
+# =========================
+# Drug Catalog Page
+# =========================
+@extend_schema(tags=["Drugs"])
+class DrugCatalogDetailView(GenericAPIView):
+    """
+    Everything a catalog page shows about a drug, from the DrugDetail read model.
+    """
+
+    def get(self, request, id):
+        document = drug_detail(id)
+        if document is None:
+            return Response(
+                {"error": "Drug not found."},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(document)
+
+
+# =========================
+# Generic Equivalents
+# =========================
+@extend_schema(
+    tags=["Drugs"],
+    parameters=[
+        OpenApiParameter("name", str, description="Drug name"),
+        OpenApiParameter("id", int, description="Drug id"),
+    ]
+)
+class DrugEquivalentsView(GenericAPIView):
+    """
+    Drugs with exactly the same active ingredients, found through the
+    indexed ingredient signature whether or not the CSV listed them.
+    """
+
+    def get(self, request):
+        params = request.query_params
+        name = params.get("name")
+        drug_id = params.get("id")
+
+        drug = None
+        if name:
+            drug = (
+                Drug.objects.annotate(name_lower=Lower("name"))
+                .filter(name_lower=name.strip().lower())
+                .first()
+            )
+        elif drug_id:
+            drug = Drug.objects.filter(id=drug_id).first()
+
+        if not drug:
+            return Response(
+                {"error": "Drug not found."},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        return Response({
+            "drug": drug.name,
+            "equivalents": list(equivalent_drugs(drug).values("id", "name"))
+        })
 
 
 # =========================
@@ -152,7 +264,12 @@ class HerbalAlternativesView(GenericAPIView):
 
         drug = None
         if name:
-            drug = Drug.objects.filter(name__icontains=name).first()
+            # exact name first, otherwise the most relevant search hit
+            drug = (
+                Drug.objects.annotate(name_lower=Lower("name"))
+                .filter(name_lower=name.strip().lower())
+                .first()
+            ) or search_drugs(name).first()
         elif drug_id:
             drug = Drug.objects.filter(id=drug_id).first()
 
@@ -162,22 +279,82 @@ class HerbalAlternativesView(GenericAPIView):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        alternatives = DrugAlternative.objects.filter(
-            drug=drug,
-            herbal_alternatives__isnull=False
-        )
+        return Response({
+            "drug": drug.name,
+            "herbal_alternatives": list(drug.herbs.order_by("name").values_list("name", flat=True))
+        })
+
 
-        herbs = set()
-        for alt in alternatives:
-            herbs.update(
-                h.strip()
-                for h in alt.herbal_alternatives.split(",")
-                if h.strip()
+@extend_schema(
+    tags=["Drugs"],
+    parameters=[OpenApiParameter("name", str, required=True, description="Herb name")]
+)
+class HerbDrugsView(GenericAPIView):
+    """
+    The reverse lookup: drugs a herb is an alternative for.
+    """
+
+    def get(self, request):
+        name = " ".join(request.query_params.get("name", "").split()).lower()
+        if not name:
+            raise ValidationError({"name": "This query parameter is required."})
+
+        herb = Herb.objects.annotate(name_lower=Lower("name")).filter(name_lower=name).first()
+        if not herb:
+            return Response(
+                {"error": "Herb not found."},
+                status=status.HTTP_404_NOT_FOUND
             )
 
         return Response({
-            "drug": drug.name,
-            "herbal_alternatives": sorted(list(herbs))
+            "herb": herb.name,
+            "drugs": list(herb.drugs.order_by("name").values_list("name", flat=True))
+        })
+
+
+# =========================
+# Catalog Search
+# =========================
+@extend_schema(tags=["Drugs"], parameters=[OpenApiParameter("q", str, required=True)])
+class DrugSearchView(generics.ListAPIView):
+    """
+    Ranked search over drug names, active ingredients, drug classes,
+    ATC codes and herbal alternatives (PostgreSQL full-text + trigram).
+    """
+    serializer_class = DrugSearchSerializer
+    pagination_class = SearchPagination
+
+    def get_queryset(self):
+        text = self.request.query_params.get("q", "").strip()
+        if not text:
+            raise ValidationError({"q": "This query parameter is required."})
+
+        return search_drugs(text).prefetch_related("active_ingredients")
+
+
+# =========================
+# Drug Name Autocomplete
+# =========================
+@extend_schema(tags=["Drugs"], parameters=[AutocompleteQuerySerializer])
+class DrugAutocompleteView(GenericAPIView):
+    """
+    Typeahead over Drug and ActiveIngredient names, served from the
+    in-memory prefix index (no table scan per keystroke).
+    """
+    serializer_class = AutocompleteQuerySerializer
+
+    def get(self, request):
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+
+        return Response({
+            "query": params["q"],
+            "results": prefix_index.get().complete(
+                params["q"],
+                limit=params["limit"],
+                kind=params.get("kind")
+            )
         })
 
 
@@ -230,6 +407,7 @@ class MarkAsTakenView(generics.UpdateAPIView):
         if today >= end_date and all_taken:
             medication.is_finished = True
             medication.save(update_fields=["is_finished"])
+            drop_interactions(medication)
             return Response({
                 "message": f"{medication.name} treatment completed."
             })
@@ -248,6 +426,33 @@ class DDIPredictView(GenericAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = DDIPredictSerializer
 
+    def resolve(self, name):
+        """
+        SMILES of an active ingredient: the DB row if it has them, otherwise
+        PubChem through the lookup cache (which writes them back to the row),
+        otherwise the closest catalog name (a likely misspelling).
+        Returns (smiles_list, source, fuzzy match or None).
+        """
+        ai = (
+            ActiveIngredient.objects.annotate(name_lower=Lower("name"))
+            .filter(name_lower=name.strip().lower())
+            .first()
+        )
+        if ai and ai.smiles:
+            return [ai.smiles], "db", None
+
+        smiles = lookup_smiles(name)
+        if smiles:
+            return [smiles], "pubchem", None
+
+        match = name_index.get().best_matches([name], settings.DRUG_FUZZY_CUTOFF)[name]
+        if match:
+            smiles_list = [ai.smiles for ai in resolve_active_ingredients(match["name"]) if ai.smiles]
+            if smiles_list:
+                return smiles_list, "fuzzy", match
+
+        return [], "pubchem", None
+
     def post(self, request):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -255,41 +460,32 @@ class DDIPredictView(GenericAPIView):
         name_a = serializer.validated_data["drug_a"]
         name_b = serializer.validated_data["drug_b"]
 
-        smiles_a = []
-        smiles_b = []
-
-        # ===== Active Ingredient A =====
-        try:
-            ai_a = ActiveIngredient.objects.get(name__iexact=name_a)
-            smiles_a.append(ai_a.smiles) if ai_a.smiles else smiles_a.append(get_smiles_from_pubchem(name_a))
-        except ActiveIngredient.DoesNotExist:
-            smiles = get_smiles_from_pubchem(name_a)
-            if smiles:
-                smiles_a.append(smiles)
-
-        # ===== Active Ingredient B =====
-        try:
-            ai_b = ActiveIngredient.objects.get(name__iexact=name_b)
-            smiles_b.append(ai_b.smiles) if ai_b.smiles else smiles_b.append(get_smiles_from_pubchem(name_b))
-        except ActiveIngredient.DoesNotExist:
-            smiles = get_smiles_from_pubchem(name_b)
-            if smiles:
-                smiles_b.append(smiles)
+        smiles_a, source_a, match_a = self.resolve(name_a)
+        smiles_b, source_b, match_b = self.resolve(name_b)
 
         # ===== Validation =====
-        print(smiles_a, smiles_b)
         if not smiles_a or not smiles_b:
+            index = name_index.get()
             return Response(
-                {"error": "Could not resolve SMILES for one or both active ingredients."},
+                {
+                    "error": "Could not resolve SMILES for one or both active ingredients.",
+                    "suggestions": {
+                        "active_ingredient_a": [] if smiles_a else index.match(
+                            name_a, cutoff=settings.DRUG_FUZZY_SUGGEST_CUTOFF
+                        ),
+                        "active_ingredient_b": [] if smiles_b else index.match(
+                            name_b, cutoff=settings.DRUG_FUZZY_SUGGEST_CUTOFF
+                        )
+                    }
+                },
                 status=400
             )
 
         # ===== DDI Prediction =====
-        max_score = 0.0
-        for s1 in smiles_a:
-            for s2 in smiles_b:
-                score = predict_ddi(s1, s2)
-                max_score = max(max_score, score)
+        scores = predict_ddi_batch(
+            [(s1, s2) for s1 in smiles_a for s2 in smiles_b]
+        )
+        max_score = max(scores, default=0.0)
 
         return Response({
             "active_ingredient_a": name_a,
@@ -297,7 +493,97 @@ class DDIPredictView(GenericAPIView):
             "interaction_probability": round(max_score, 4),
             "risk_level": classify_severity(max_score),
             "smiles_source": {
-                "active_ingredient_a": "db" if len(smiles_a) else "pubchem",
-                "active_ingredient_b": "db" if len(smiles_b) else "pubchem"
+                "active_ingredient_a": source_a,
+                "active_ingredient_b": source_b
+            },
+            "name_match": {
+                "active_ingredient_a": match_a,
+                "active_ingredient_b": match_b
             }
-        })
\ No newline at end of file
+        })
+
+
+# =========================
+# Regimen Interactions API
+# =========================
+class RegimenUserMixin:
+
+    def get_regimen_user(self, request, patient_id):
+        if patient_id is None:
+            return request.user
+
+        if request.user.role != 'careperson':
+            raise ValidationError({"patient_id": "Only carepersons can check a patient's regimen"})
+
+        try:
+            return request.user.careperson_profile.patients.get(id=patient_id).user
+        except Patient.DoesNotExist:
+            raise ValidationError({"patient_id": "Patient not found or unauthorized"})
+
+
+@extend_schema(tags=["Drugs"])
+class RegimenInteractionsView(RegimenUserMixin, GenericAPIView):
+    permission_classes = [IsAuthenticated]
+    serializer_class = RegimenInteractionsSerializer
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        names = serializer.validated_data.get("drugs")
+        if names is not None:
+            return Response(regimen_matrix(names))
+
+        # the user's own medications: start from their stored catalog links
+        user = self.get_regimen_user(request, serializer.validated_data.get("patient_id"))
+        return Response(medication_regimen_matrix(
+            Medication.objects.filter(user=user, is_finished=False).order_by("id")
+        ))
+
+
+@extend_schema(tags=["Drugs"])
+class InteractionGraphView(RegimenUserMixin, GenericAPIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        patient_id = request.query_params.get("patient_id")
+        if patient_id is not None and not patient_id.isdigit():
+            raise ValidationError({"patient_id": "A valid integer is required."})
+
+        user = self.get_regimen_user(request, int(patient_id) if patient_id else None)
+
+        medications = Medication.objects.filter(
+            user=user,
+            is_finished=False
+        ).values("id", "name")
+
+        edges = MedicationInteraction.objects.filter(user=user).values(
+            "medication_a", "medication_b", "score", "severity", "model_version"
+        )
+
+        return Response({
+            "medications": list(medications),
+            "interactions": [
+                {
+                    "medication_a": edge["medication_a"],
+                    "medication_b": edge["medication_b"],
+                    "interaction_probability": edge["score"],
+                    "risk_level": edge["severity"],
+                    "model_version": edge["model_version"]
+                }
+                for edge in edges
+            ]
+        })
+
+
+# =========================
+# Interaction Screening Status
+# =========================
+@extend_schema(tags=["Drugs"])
+class ScreeningJobView(generics.RetrieveAPIView):
+    serializer_class = ScreeningJobSerializer
+    permission_classes = [IsAuthenticated]
+    lookup_field = "id"
+
+    def get_queryset(self):
+        return ScreeningJob.objects.filter(user=self.request.user)
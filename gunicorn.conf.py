@@ -0,0 +1,23 @@
+"""
+Gunicorn settings and server hooks, picked up from the project root.
+
+DDI_PRELOAD=True imports the app and loads the DDI model once in the master,
+before workers fork. Workers (including ones recycled by max_requests)
+then start warm and share the model weights instead of loading their own.
+"""
+import os
+
+preload_app = os.getenv("DDI_PRELOAD", "False") == "True"
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+
+    from drugs.services import ddi_model
+
+    info = ddi_model.preload()
+    server.log.info(
+        "DDI model preloaded in %ss (warmup %ss): backend=%s mode=%s",
+        info["load_seconds"], info["warmup_seconds"], info["backend"], info["mode"]
+    )